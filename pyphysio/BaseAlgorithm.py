@@ -1,6 +1,6 @@
 # coding=utf-8
 from abc import abstractmethod as _abstract, ABCMeta as _ABCMeta
-from pyphysio.Signal import Signal
+from pyphysio.Signal import Signal, QuantizedSignal as _QuantizedSignal
 from pyphysio.Utility import PhUI as _PhUI
 
 __author__ = 'AleB'
@@ -14,6 +14,9 @@ class Algorithm(object):
 
     _log = None
 
+    # Whether algorithm() can work directly on the integer counts of a QuantizedSignal
+    _quantized = False
+
     def __init__(self, **kwargs):
         """
         Incorporates the parameters and saves them in the instance.
@@ -75,11 +78,34 @@ class Algorithm(object):
             _PhUI.w("The data must be a Signal (see class EvenlySignal and UnevenlySignal).")
             use_cache = False
         if use_cache is True:
+            # also a QuantizedSignal keeps its own cache, whatever algorithm() receives
             Cache.cache_check(data)
             # noinspection PyTypeChecker
             return Cache.run_cached(data, cls, kwargs)
         else:
-            return cls.algorithm(data, kwargs)
+            return cls.compute(data, kwargs)
+
+    @classmethod
+    def compute(cls, data, params):
+        """
+        Computes the algorithm without the cache: algorithm() or, for a QuantizedSignal and an algorithm that does not
+        work on the counts, algorithm_quantized()
+        @return: The result.
+        """
+        if isinstance(data, _QuantizedSignal) and not cls._quantized:
+            return cls.algorithm_quantized(data, params)
+        return cls.algorithm(data, params)
+
+    @classmethod
+    def algorithm_quantized(cls, signal, params):
+        """
+        Computes the algorithm on a QuantizedSignal, for the algorithms that do not work on the counts. By default the
+        signal is dequantized as a whole (once, the result is cached on the QuantizedSignal); the algorithms that can
+        combine the results of portions of the signal override this to dequantize a block at a time (see
+        QuantizedSignal.dequantize_blocks).
+        @return: The result.
+        """
+        return cls.algorithm(signal.to_evenly(), params)
 
     @classmethod
     @_abstract
@@ -205,7 +231,7 @@ class Cache(object):
 
         if key not in obj._cache:
             algorithm.set_logger()
-            val = algorithm.algorithm(obj, params)
+            val = algorithm.compute(obj, params)
             log = algorithm.unset_logger()
             obj._cache[key] = (val, log)
         else:
@@ -1,5 +1,7 @@
 # coding=utf-8
+import numpy as _np
 from pyphysio.BaseAlgorithm import Algorithm
+from pyphysio.Signal import EvenlySignal as _EvenlySignal, QuantizedSignal as _QuantizedSignal
 from abc import ABCMeta as _ABCMeta
 __author__ = 'AleB'
 
@@ -9,4 +11,159 @@ class Filter(Algorithm):
     Algorithms that take as input a signal and return another signal of the same nature.
     """
     __metaclass__ = _ABCMeta
-    pass
+
+    # Whether to apply algorithm() separately on each run of valid samples when the signal has gaps, so that
+    # the output does not depend on the missing samples
+    _split_gaps = False
+
+    # number of samples processed at a time by run_chunked
+    _chunk_size = 1 << 20
+
+    @classmethod
+    def run(cls, data, params=None, use_cache=True, **kwargs):
+        if isinstance(data, _QuantizedSignal) and not cls._quantized and len(data) > cls._chunk_size:
+            p = dict(params) if type(params) is dict else {}
+            p.update(kwargs)
+            if (cls._split_gaps or not data.has_gaps()) and cls.get_chunk_overlap(data, p) is not None:
+                # dequantized one chunk at a time, never as a whole
+                return cls.run_chunked(data, p)
+        return cls._run_whole(data, params, use_cache, **kwargs)
+
+    @classmethod
+    def _run_whole(cls, data, params=None, use_cache=True, **kwargs):
+        if cls._split_gaps and isinstance(data, _EvenlySignal) and data.has_gaps():
+            run = super(Filter, cls).run
+            # missing samples are kept as they are
+            values = _np.array(data.get_values(), dtype=float)
+            for b, e in data.get_valid_runs():
+                out = run(data.segment_iidx(b, e), params, use_cache, **kwargs)
+                assert len(out) == e - b, "The filter changes the length of the signal, it can't be applied on " \
+                                          "a signal with gaps"
+                values[b:e] = out
+            out = _EvenlySignal(values=values,
+                                sampling_freq=data.get_sampling_freq(),
+                                signal_nature=data.get_signal_nature(),
+                                start_time=data.get_start_time())
+            out.set_gaps(data.get_gaps())
+            return out
+        return super(Filter, cls).run(data, params, use_cache, **kwargs)
+
+    @classmethod
+    def get_chunk_overlap(cls, signal, params):
+        """
+        Number of samples on each side of a portion of the signal that determine the result in the portion (to within
+        rounding), None if the result depends on the whole signal. Used by run_chunked.
+        """
+        return None
+
+    @classmethod
+    def get_chunk_alignment(cls, signal, params):
+        """
+        The chunks of run_chunked start at multiples of this number of samples (e.g. a decimation factor)
+        """
+        return 1
+
+    def chunked(self, signal, chunk_size=None, out=None):
+        """
+        Applies the filter chunk by chunk (see run_chunked)
+        """
+        return self.run_chunked(signal, self._params, chunk_size, out)
+
+    @classmethod
+    def run_chunked(cls, signal, params, chunk_size=None, out=None):
+        """
+        Applies the filter on chunks of the signal, extended on each side by get_chunk_overlap samples, and stitches
+        the results. The result is the same as filtering the whole signal, but only a chunk at a time is loaded and
+        processed (e.g. for memory mapped values). Filters whose result depends on the whole signal are applied on the
+        whole signal.
+
+        Parameters
+        ----------
+        signal : EvenlySignal
+            The signal to filter
+        params : dict
+            The parameters of the filter
+
+        Optional parameters
+        -------------------
+        chunk_size : int, >0, default = _chunk_size
+            Number of samples of each chunk, without the overlap
+        out : numpy.array
+            Where to write the values of the result (e.g. a numpy.memmap), by default a new array
+
+        Returns
+        -------
+        signal : EvenlySignal
+            The filtered signal
+        """
+        overlap = None
+        if isinstance(signal, _EvenlySignal) and len(signal.get_valid_runs()) > 0 and \
+                not (isinstance(signal, _QuantizedSignal) and cls._quantized) and \
+                not (signal.has_gaps() and not cls._split_gaps):
+            overlap = cls.get_chunk_overlap(signal, params)
+
+        if overlap is None:
+            cls.warn("The result depends on the whole signal: not applied in chunks")
+            result = cls.run(signal, params, use_cache=False)
+            if out is not None:
+                out[:len(result)] = result.get_values()
+                result = cls._chunked_output(result, 0, out[:len(result)], result.get_gaps())
+            return result
+
+        if chunk_size is None:
+            chunk_size = cls._chunk_size
+        assert chunk_size > 0, "The chunk size should be positive"
+        # the chunks and the overlaps keep the alignment from the start of each run
+        step = cls.get_chunk_alignment(signal, params)
+        chunk_size = -(-chunk_size // step) * step
+        overlap = -(-overlap // step) * step
+
+        has_gaps = signal.has_gaps()
+        if has_gaps:
+            # missing samples are kept as they are
+            if out is None:
+                out = _np.array(signal.get_values(), dtype=float)
+            else:
+                out[:len(signal)] = signal.get_values()
+
+        first = None
+        pieces = []
+        k = 0
+        for b, e in (signal.get_valid_runs() if has_gaps else [(0, len(signal))]):
+            for a in range(b, e, chunk_size):
+                c = min(a + chunk_size, e)
+                result = cls._run_whole(signal.segment_iidx(max(a - overlap, b), min(c + overlap, e)), params,
+                                        use_cache=False)
+
+                # the samples of the result at the times of [a, c)
+                fsamp, start = result.get_sampling_freq(), result.get_start_time()
+                i = max(int(_np.ceil((signal.get_time(a) - start) * fsamp - 1e-6)), 0)
+                j = min(int(_np.ceil((signal.get_time(c) - start) * fsamp - 1e-6)), len(result))
+                if first is None:
+                    first = result, i
+
+                piece = result.get_values()[i:j]
+                if has_gaps:
+                    assert len(piece) == c - a, "The filter changes the length of the signal, it can't be applied " \
+                                                "on a signal with gaps"
+                    out[a:c] = piece
+                elif out is not None:
+                    out[k:k + len(piece)] = piece
+                else:
+                    pieces.append(piece)
+                k += len(piece)
+
+        if has_gaps:
+            return cls._chunked_output(first[0], 0, out[:len(signal)], signal.get_gaps())
+        return cls._chunked_output(first[0], first[1], out[:k] if out is not None else _np.concatenate(pieces))
+
+    @staticmethod
+    def _chunked_output(result, i, values, gaps=None):
+        # signal with the given values, the metadata of result from its sample i
+        out = _EvenlySignal(values=values,
+                            sampling_freq=result.get_sampling_freq(),
+                            signal_nature=result.get_signal_nature(),
+                            start_time=result.get_start_time() + i / result.get_sampling_freq())
+        if gaps is not None and len(gaps) > 0:
+            out.set_gaps(gaps)
+        return out
@@ -1,5 +1,7 @@
 # coding=utf-8
+import numpy as _np
 from pyphysio.BaseAlgorithm import Algorithm
+from pyphysio.Signal import SegmentsBatch as _SegmentsBatch
 from abc import ABCMeta as _ABCMeta
 __author__ = 'AleB'
 
@@ -9,4 +11,30 @@ class Indicator(Algorithm):
     Algorithms that take as input a signal and return a scalar value.
     """
     __metaclass__ = _ABCMeta
-    pass
+
+    @classmethod
+    def run(cls, data, params=None, use_cache=True, **kwargs):
+        if isinstance(data, _SegmentsBatch):
+            if type(params) is dict:
+                kwargs.update(params)
+            return cls.algorithm_batch(data, kwargs)
+        return super(Indicator, cls).run(data, params, use_cache, **kwargs)
+
+    @classmethod
+    def algorithm_batch(cls, batch, params):
+        """
+        Computes the indicator on each segment of a SegmentsBatch, one segment at a time.
+        Indicators that can reduce the whole block at once override this.
+        @return: An array with a value for each segment
+        """
+        return _np.array([cls.algorithm(x, params) for x in batch])
+
+    @classmethod
+    def algorithm_rolling(cls, signal, starts, stops, params):
+        """
+        Computes the indicator on many windows [start, stop) of the same signal, one window at a time.
+        Indicators that can update the result from a window to the next (with a cost that does not depend on the
+        overlap) override this.
+        @return: An array with a value for each window
+        """
+        return _np.array([cls.algorithm(signal.segment_iidx(b, e), params) for b, e in zip(starts, stops)])
@@ -1,6 +1,11 @@
 # coding=utf-8
 from abc import abstractmethod as _abstract, ABCMeta as _ABCMeta
 from copy import copy as _cpy
+from threading import Thread as _Thread, Event as _Event, current_thread as _current_thread
+try:
+    from queue import Queue as _Queue, Full as _Full
+except ImportError:
+    from Queue import Queue as _Queue, Full as _Full
 from pyphysio.BaseAlgorithm import Algorithm as _Algorithm
 from pyphysio.Signal import EvenlySignal as _EvenlySignal
 
@@ -41,6 +46,9 @@ class Segment(object):
     def get_label(self):
         return self._label
 
+    def get_signal(self):
+        return self._signal
+
     def is_empty(self):
         return self._signal is None or self.get_begin_time() >= len(self._signal.get_end_time())
 
@@ -60,6 +68,9 @@ class SegmentsGenerator(_Algorithm):
     """
     __metaclass__ = _ABCMeta
 
+    # segments are views, the counts are never touched
+    _quantized = True
+
     @_abstract
     def __init__(self, **kwargs):
         super(SegmentsGenerator, self).__init__(**kwargs)
@@ -89,6 +100,9 @@ class SegmentsGenerator(_Algorithm):
     def __iter__(self):
         return SegmentationIterator(self)
 
+    def get_signal(self):
+        return self._signal
+
     @classmethod
     def algorithm(cls, data, params):
         o = cls(**params)
@@ -120,9 +134,118 @@ class SegmentationIterator(object):
         self._win = _cpy(win)
         self._win.init_segmentation()
 
+    def __iter__(self):
+        return self
+
     def next(self):
         return self._win.next_segment()
 
+    __next__ = next
+
+
+class PrefetchIterator(object):
+    """
+    Iterates over the segments loading in a background thread the portions of the signal of the next segments, so
+    that reading them (e.g. from a memory-mapped or compressed source) overlaps with the computation on the current
+    one. Yields (segment, portion) pairs, in the order of the segments.
+
+    Parameters
+    ----------
+    segments : iterable
+        The segments (e.g. an initialized SegmentsGenerator)
+
+    Optional parameters
+    -------------------
+    signal : Signal
+        The signal to segment, by default the one referenced in each segment
+    read_ahead : int, >0, default=4
+        Maximum number of loaded portions waiting to be used
+    load : function
+        Function load(segment, signal) returning the portion, by default the segment of the signal copied in memory
+    """
+
+    _END = object()
+
+    def __init__(self, segments, signal=None, read_ahead=4, load=None):
+        assert read_ahead > 0, "The read ahead has to be positive"
+        self._queue = _Queue(maxsize=read_ahead)
+        self._closed = _Event()
+        self._done = False
+        # the thread does not refer to the iterator, so that an abandoned iterator is collected (and closed)
+        self._thread = _Thread(target=self._produce,
+                               args=(iter(segments), signal, load if load is not None else self._load, self._queue,
+                                     self._closed))
+        self._thread.daemon = True
+        self._thread.start()
+
+    @staticmethod
+    def _load(segment, signal):
+        return segment(signal).copy()
+
+    @classmethod
+    def _produce(cls, segments, signal, load, queue, closed):
+        try:
+            for seg in segments:
+                if not cls._put(queue, closed, (seg, load(seg, signal))):
+                    return
+            cls._put(queue, closed, (cls._END, None))
+        except Exception as e:
+            # raised again in the consumer thread
+            cls._put(queue, closed, (cls._END, e))
+
+    @staticmethod
+    def _put(queue, closed, item):
+        # gives up if the iterator is closed while the queue is full
+        while not closed.is_set():
+            try:
+                queue.put(item, timeout=.1)
+                return True
+            except _Full:
+                pass
+        return False
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if self._done:
+            raise StopIteration()
+        seg, portion = self._queue.get()
+        if seg is self._END:
+            self.close()
+            if portion is not None:
+                raise portion
+            raise StopIteration()
+        return seg, portion
+
+    __next__ = next
+
+    def close(self):
+        """
+        Stops the loading of the next segments and waits for the loading thread to end
+        """
+        self._done = True
+        self._closed.set()
+        if self._thread is not _current_thread():
+            self._thread.join()
+
+    def is_alive(self):
+        """
+        Whether the loading thread is running
+        """
+        return self._thread.is_alive()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        # abandoned without close()
+        if hasattr(self, '_thread'):
+            self.close()
+
 
 class SegmentationError(Exception):
     """
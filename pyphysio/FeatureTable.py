@@ -0,0 +1,99 @@
+# coding=utf-8
+from __future__ import division
+import numpy as _np
+
+__author__ = 'AleB'
+
+
+class FeatureTable(object):
+    """
+    Typed results of fmap: begin and end times (float64), labels (object) and a float64 column for each algorithm.
+    The data is held in a single numpy structured array, filled one row at a time by TableSink: the columns are views
+    on its fields and to_structured/to_records do not copy.
+
+    Attributes:
+    -----------
+
+    data : numpy.array
+        Structured array with the fields 'begin', 'end', 'label' and one field per algorithm
+    """
+
+    def __init__(self, data):
+        assert data.dtype.names is not None and data.dtype.names[:3] == ('begin', 'end', 'label'), \
+            "The data should be a structured array with fields 'begin', 'end', 'label', ..."
+        self._data = data
+        # one view per field, built once
+        self._columns = dict((name, data[name]) for name in data.dtype.names)
+
+    @classmethod
+    def from_rows(cls, rows, col_names):
+        """
+        Builds the table from rows ([begin, end, label] + values) as produced by fmap or ifmap, filling the structured
+        array one row at a time (rows can be a generator, the rows are not kept).
+        Missing values (None) become NaN; repeated column names get a numeric suffix.
+        """
+        from .Sinks import TableSink
+        sink = TableSink()
+        sink.open(col_names)
+        for row in rows:
+            sink.write(row)
+        sink.close()
+        return sink.get_table()
+
+    def get_names(self):
+        """
+        Names of the algorithms columns
+        """
+        return list(self._data.dtype.names[3:])
+
+    def get_begins(self):
+        return self._columns['begin']
+
+    def get_ends(self):
+        return self._columns['end']
+
+    def get_labels(self):
+        return self._columns['label']
+
+    def get_column(self, name):
+        """
+        The values of a column, a (strided) view on the structured array
+        """
+        return self._columns[name]
+
+    def get_values(self):
+        """
+        Values of the algorithms as a float64 matrix (segment x algorithm). This is a copy.
+        """
+        names = self.get_names()
+        out = _np.empty((len(self), len(names)))
+        for i, name in enumerate(names):
+            out[:, i] = self._columns[name]
+        return out
+
+    def get_nan_mask(self):
+        """
+        Where the values of the algorithms are missing (segment x algorithm)
+        """
+        return _np.isnan(self.get_values())
+
+    def to_structured(self):
+        """
+        The table as a numpy structured array (one record per segment), without copying
+        """
+        return self._data
+
+    def to_records(self):
+        """
+        The table as a numpy record array, a view on the structured array
+        """
+        return self._data.view(_np.recarray)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def __repr__(self):
+        return "<feature table: " + str(len(self)) + " segments, columns: " + ", ".join(self._data.dtype.names) + ">"
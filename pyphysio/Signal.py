@@ -28,11 +28,89 @@ def from_pickle(path):
     return from_pickleable(p)
 
 
+def _interp_vectorized(x, y, x_out, kind):
+    """
+    Linear or nearest interpolation without building an interpolator object.
+    Same results of scipy's interp1d within [x[0], x[-1]], constant values outside.
+    """
+    if kind == 'linear':
+        return _np.interp(x_out, x, y)
+    else:
+        # nearest, ties to the left sample as interp1d does
+        return _np.asarray(y)[_np.searchsorted((x[1:] + x[:-1]) / 2., x_out, side='left')]
+
+
+def align(signals, sampling_freq, start_time=None, end_time=None, kind='linear'):
+    """
+    Bring several signals on the same time grid, e.g. to combine ECG, EDA and respiration
+
+    Parameters
+    ----------
+    signals : list of Signal
+        The signals to align
+    sampling_freq : float, >0
+        Sampling frequency of the common grid
+    start_time : float
+        Instant of the first sample of the grid. By default is the latest start time of the signals
+    end_time : float
+        Instant of the end of the grid (exclusive). By default is the earliest end time of the signals
+    kind : str
+        Method for interpolation: 'linear', 'nearest' (vectorized) or any other kind accepted by resample
+
+    Returns
+    -------
+    aligned : list of EvenlySignal
+        The signals sampled on the common grid. Signals that are already on the grid are returned as views (no copy).
+    """
+    assert sampling_freq > 0, "The sampling frequency cannot be zero or negative"
+    assert len(signals) > 0, "No signals to align"
+
+    if start_time is None:
+        start_time = max([x.get_start_time() for x in signals])
+    if end_time is None:
+        end_time = min([x.get_end_time() for x in signals])
+    assert end_time > start_time, "The signals do not overlap"
+
+    n = int(_np.round((end_time - start_time) * sampling_freq, 10))
+    # grid instants, shared by all the signals
+    times = _np.arange(n) / sampling_freq + start_time
+
+    out = []
+    for sig in signals:
+        values = None
+        if isinstance(sig, EvenlySignal) and sig.get_sampling_freq() == sampling_freq:
+            shift = (start_time - sig.get_start_time()) * sampling_freq
+            i_start = int(_np.round(shift))
+            if abs(shift - i_start) < 1e-6 and i_start >= 0 and i_start + n <= len(sig):
+                # already on the grid: zero-copy
+                values = sig.get_values()[i_start:i_start + n]
+
+        if values is None:
+            x = _np.arange(len(sig)) if isinstance(sig, EvenlySignal) else sig.get_indices()
+            # grid instants in (fractional) indices of the signal
+            x_out = (times - sig.get_start_time()) * sig.get_sampling_freq()
+
+            if kind in ['linear', 'nearest']:
+                # constant outside the signal
+                values = _interp_vectorized(x, sig.get_values(), x_out, kind)
+            else:
+                tck = _interp.interp1d(x, sig.get_values(), kind=kind, bounds_error=False,
+                                       fill_value=(sig.get_values()[0], sig.get_values()[-1]))
+                values = tck(x_out)
+
+        out.append(EvenlySignal(values=values,
+                                sampling_freq=sampling_freq,
+                                signal_nature=sig.get_signal_nature(),
+                                start_time=start_time))
+    return out
+
+
 class Signal(_np.ndarray):
     _MT_NATURE = "signal_nature"
     _MT_START_TIME = "start_time"
     _MT_SAMPLING_FREQ = "sampling_freq"
     _MT_INFO_ATTR = "_pyphysio"
+    _MT_GAPS = "gaps"
 
     def __new__(cls, values, sampling_freq, start_time=None, signal_nature=""):
         # TODO (feature) multichannel signals
@@ -55,11 +133,38 @@ class Signal(_np.ndarray):
         if obj is not None and hasattr(obj, self._MT_INFO_ATTR):
             # The cache is not in MT_INFO_ATTR
             self._pyphysio = getattr(obj, self._MT_INFO_ATTR).copy()
+            if self._MT_GAPS in self._pyphysio:
+                self._finalize_gaps(obj)
+
+    def _finalize_gaps(self, obj):
+        # the gaps are in the indices of obj: shift them on a (forward) slice of obj, drop them on any other change of
+        # shape or layout (e.g. s[::-1], np.diff(s))
+        gaps = self._pyphysio.pop(self._MT_GAPS)
+        if self.ndim != 1 or not isinstance(obj, _np.ndarray) or obj.ndim != 1:
+            return
+        if not _np.may_share_memory(self, obj):
+            # new values computed sample by sample from obj (e.g. s * 2)
+            if len(self) == len(obj):
+                self._pyphysio[self._MT_GAPS] = gaps
+            return
+        if self.strides != obj.strides or obj.strides[0] == 0:
+            return
+        offset, rest = divmod(self.__array_interface__['data'][0] - obj.__array_interface__['data'][0],
+                              obj.strides[0])
+        if rest == 0 and 0 <= offset <= len(obj):
+            gaps = _np.clip(gaps - offset, 0, len(self))
+            self._pyphysio[self._MT_GAPS] = gaps[gaps[:, 1] > gaps[:, 0]]
 
     def __array_wrap__(self, out_arr, context=None):
-        # Just call the parent's
         # noinspection PyArgumentList
-        return _np.ndarray.__array_wrap__(self, out_arr, context)
+        out = _np.ndarray.__array_wrap__(self, out_arr, context)
+        if context is not None and isinstance(out, Signal) and out.ndim == 1:
+            # a sample is missing if it is missing in any of the inputs
+            gaps = [x.get_gaps() for x in context[1] if isinstance(x, Signal) and x.shape == out.shape]
+            if sum(len(g) for g in gaps) > len(out.get_gaps()):
+                out.set_gaps(_np.concatenate(gaps))
+                setattr(out, "_mutated", False)
+        return out
 
     @property
     def ph(self):
@@ -74,6 +179,102 @@ class Signal(_np.ndarray):
 
     def get_values(self):
         return _np.asarray(self)
+
+    def get_gaps(self):
+        """
+        Runs of missing samples, as an (n, 2) array of [iidx_start, iidx_stop) pairs (sorted, not overlapping)
+        """
+        return self.ph.get(self._MT_GAPS, _np.zeros((0, 2), dtype=int))
+
+    def set_gaps(self, gaps):
+        """
+        Mark runs of samples as missing
+
+        Parameters
+        ----------
+        gaps : array
+            List of [iidx_start, iidx_stop) pairs. Overlapping or adjacent runs are merged.
+
+        Notes
+        -----
+        Forward slices (s[a:b]) keep the gaps in their own indices, the results of element-wise operations keep the
+        gaps of all their inputs, any other view (e.g. s[::-1]) has no gaps.
+        """
+        gaps = _np.asarray(gaps, dtype=int).reshape(-1, 2)
+        gaps = _np.clip(gaps, 0, len(self))
+        gaps = gaps[gaps[:, 1] > gaps[:, 0]]
+        if len(gaps) > 0:
+            gaps = gaps[_np.argsort(gaps[:, 0], kind='mergesort')]
+            ends = _np.maximum.accumulate(gaps[:, 1])
+            first = _np.r_[True, gaps[1:, 0] > ends[:-1]]
+            last = _np.r_[first[1:], True]
+            gaps = _np.c_[gaps[first, 0], ends[last]]
+        setattr(self, "_mutated", True)
+        self.ph[self._MT_GAPS] = gaps
+
+    def set_mask(self, valid):
+        """
+        Mark as missing the samples where valid is False. Only the runs of missing samples are stored.
+        """
+        valid = _np.asarray(valid, dtype=bool)
+        assert len(valid) == len(self), "Length mismatch (mask:%d vs. signal:%d)" % (len(valid), len(self))
+        changes = _np.diff(_np.r_[0, (~valid).astype(_np.int8), 0])
+        self.set_gaps(_np.c_[_np.where(changes == 1)[0], _np.where(changes == -1)[0]])
+
+    def get_mask(self):
+        """
+        Validity of each sample (False in the gaps)
+        """
+        valid = _np.ones(len(self), dtype=bool)
+        for b, e in self.get_gaps():
+            valid[b:e] = False
+        return valid
+
+    def has_gaps(self):
+        return len(self.get_gaps()) > 0
+
+    def get_valid_runs(self):
+        """
+        Runs of valid samples, as an (n, 2) array of [iidx_start, iidx_stop) pairs
+        """
+        gaps = self.get_gaps()
+        runs = _np.c_[_np.r_[0, gaps[:, 1]], _np.r_[gaps[:, 0], len(self)]]
+        return runs[runs[:, 1] > runs[:, 0]]
+
+    def get_valid_values(self):
+        """
+        Values of the signal without the samples in the gaps
+        """
+        if not self.has_gaps():
+            return self.get_values()
+        return _np.concatenate([self.get_values()[b:e] for b, e in self.get_valid_runs()])
+
+    def is_valid(self, iidx_start, iidx_stop):
+        """
+        Whether no gap overlaps the [iidx_start, iidx_stop) portion
+        """
+        if iidx_start is None:
+            iidx_start = 0
+        gaps = self.get_gaps()
+        # first gap ending after the start
+        i = _np.searchsorted(gaps[:, 1], iidx_start, side='right')
+        return i == len(gaps) or gaps[i, 0] >= iidx_stop
+
+    def is_valid_many(self, iidx_starts, iidx_stops):
+        """
+        Vectorized is_valid
+        """
+        gaps = self.get_gaps()
+        i = _np.searchsorted(gaps[:, 1], iidx_starts, side='right')
+        return (i == len(gaps)) | (_np.r_[gaps[:, 0], 0][i] >= _np.asarray(iidx_stops))
+
+    def _copy_gaps(self, out, iidx_start, iidx_stop):
+        # gaps of the [iidx_start, iidx_stop) portion, in the indices of the portion out
+        if self.has_gaps():
+            iidx_start = int(iidx_start) % len(self) if iidx_start < 0 else int(iidx_start)
+            out.set_gaps(_np.clip(self.get_gaps() - iidx_start, 0, len(out)))
+            setattr(out, "_mutated", False)
+        return out
     
     def get_signal_nature(self):
         return self.ph[self._MT_NATURE]
@@ -131,6 +332,38 @@ class Signal(_np.ndarray):
     def segment_time(self, t_start, t_stop=None):
         pass
 
+    def get_idx_many(self, times):
+        """
+        Vectorized get_idx
+        """
+        return ((_np.asarray(times, dtype=float) - self.get_start_time()) * self.get_sampling_freq()).astype(int)
+
+    @_abstract
+    def get_iidx_many(self, times):
+        pass
+
+    def segment_many(self, t_starts, t_stops):
+        """
+        Segment the signal given many time intervals at once
+
+        Parameters
+        ----------
+        t_starts : array
+            The instants of the start of the intervals
+        t_stops : array
+            The instants of the end of the intervals, same length of t_starts
+
+        Returns
+        -------
+        portions : SegmentViews
+            Lazy sequence of the selected portions. The bounds of all the portions are computed here, the portions
+            are built only when accessed. Use to_array() to get them as a single padded 2-D block.
+        """
+        t_starts = _np.asarray(t_starts, dtype=float)
+        t_stops = _np.asarray(t_stops, dtype=float)
+        assert t_starts.shape == t_stops.shape, "The number of starts has to be equal to the number of stops"
+        return SegmentViews(self, t_starts, t_stops)
+
     def plot(self, style="", vlines_height=1000):
         _xlabel("time")
         _ylabel(self.get_signal_nature())
@@ -187,6 +420,9 @@ class EvenlySignal(Signal):
     def get_iidx(self, time):
         return self.get_idx(time)
 
+    def get_iidx_many(self, times):
+        return _np.clip(self.get_idx_many(times), 0, len(self))
+
     def get_time_from_iidx(self, iidx):
         return self.get_time(iidx)
 
@@ -225,11 +461,14 @@ class EvenlySignal(Signal):
             indexes_out = _np.arange(len(self) * fout / self.get_sampling_freq()) * ratio
             self_l = _np.append(self, self[-1])
 
-            if kind == 'cubic':
-                tck = _interp.InterpolatedUnivariateSpline(indexes, self_l)
+            if kind in ['linear', 'nearest']:
+                signal_out = _interp_vectorized(indexes, self_l, indexes_out, kind)
             else:
-                tck = _interp.interp1d(indexes, self_l, kind=kind)
-            signal_out = tck(indexes_out)
+                if kind == 'cubic':
+                    tck = _interp.InterpolatedUnivariateSpline(indexes, self_l)
+                else:
+                    tck = _interp.interp1d(indexes, self_l, kind=kind)
+                signal_out = tck(indexes_out)
 
         return EvenlySignal(values=signal_out,
                             sampling_freq=fout,
@@ -292,7 +531,7 @@ class EvenlySignal(Signal):
                                   signal_nature=self.get_signal_nature(),
                                   start_time=self.get_time(iidx_start))
 
-        return out_signal
+        return self._copy_gaps(out_signal, iidx_start, iidx_stop)
 
     def to_csv(self, filename, comment=''):
         values = self.get_values()
@@ -307,6 +546,260 @@ class EvenlySignal(Signal):
             _np.ndarray).__repr__()
 
 
+class QuantizedSignal(EvenlySignal):
+    """
+    Evenly spaced signal stored as integer counts (e.g. the raw ADC output) plus a linear scale.
+
+    The physical values are computed as counts * gain + offset and are only produced (as float64) when read through
+    get_values() or dequantize(), so the signal itself keeps the memory footprint of the integer buffer.
+    Algorithms that are not quantization-aware receive the dequantized EvenlySignal (see Algorithm.run).
+
+    Attributes:
+    -----------
+
+    data : numpy.array of int
+        Integer counts of the signal
+    sampling_freq : float, >0
+        Sampling frequency
+    gain : float, >0, default = 1
+        Physical units per count
+    offset : float, default = 0
+        Physical value of the count 0
+    signal_nature : str, default = ''
+        Type of signal (e.g. 'ECG', 'EDA')
+    start_time: float,
+        Instant of signal start
+    """
+
+    _MT_GAIN = "gain"
+    _MT_OFFSET = "offset"
+
+    # number of samples dequantized at a time by dequantize_blocks
+    _block_size = 1 << 16
+
+    def __new__(cls, values, sampling_freq, gain=1., offset=0., start_time=None, signal_nature=""):
+        assert gain > 0, "The gain must be positive"
+        assert _np.issubdtype(_np.asarray(values).dtype, _np.integer), "The counts must be integers"
+        obj = EvenlySignal.__new__(cls, values=values,
+                                   sampling_freq=sampling_freq,
+                                   start_time=start_time,
+                                   signal_nature=signal_nature)
+        obj.ph[cls._MT_GAIN] = gain
+        obj.ph[cls._MT_OFFSET] = offset
+        return obj
+
+    def get_gain(self):
+        return self.ph[self._MT_GAIN]
+
+    def get_offset(self):
+        return self.ph[self._MT_OFFSET]
+
+    def get_counts(self):
+        return _np.asarray(self)
+
+    def get_values(self):
+        return self.dequantize()
+
+    def dequantize(self, iidx_start=None, iidx_stop=None):
+        """
+        Compute the physical values of a portion of the signal, leaving the rest quantized
+
+        Parameters
+        ----------
+        iidx_start : int
+            The index of the start of the portion. By default is the start of the signal
+        iidx_stop : int
+            The index of the end of the portion. By default is the length of the signal
+
+        Returns
+        -------
+        values : numpy.array
+            The float64 values of the portion
+        """
+        counts = self.get_counts()[iidx_start:iidx_stop]
+        return self.to_physical(counts)
+
+    def dequantize_blocks(self, block_size=None):
+        """
+        Physical values of the valid samples (the gaps are skipped), dequantized a block at a time so that the whole
+        signal is never in memory as float64
+
+        Parameters
+        ----------
+        block_size : int
+            Maximum number of samples of each block. By default is QuantizedSignal._block_size
+
+        Returns
+        -------
+        blocks : generator of numpy.array
+            The float64 values of each block
+        """
+        if block_size is None:
+            block_size = self._block_size
+        for b, e in self.get_valid_runs():
+            for i in range(b, e, block_size):
+                yield self.dequantize(i, min(i + block_size, e))
+
+    def to_physical(self, counts):
+        return _np.asarray(counts, dtype=_np.float64) * self.get_gain() + self.get_offset()
+
+    def to_counts(self, values):
+        """
+        Express physical quantities (e.g. thresholds) in counts, without rounding.
+        """
+        return (_np.asarray(values, dtype=_np.float64) - self.get_offset()) / self.get_gain()
+
+    def to_evenly(self):
+        """
+        Dequantize the whole signal
+
+        Returns
+        -------
+        signal : EvenlySignal
+            The signal in physical units
+        """
+        return self._copy_gaps(EvenlySignal(values=self.dequantize(),
+                                            sampling_freq=self.get_sampling_freq(),
+                                            signal_nature=self.get_signal_nature(),
+                                            start_time=self.get_start_time()), 0, len(self))
+
+    def resample(self, fout, kind='linear'):
+        return self.to_evenly().resample(fout, kind)
+
+    def segment_iidx(self, iidx_start, iidx_stop=None):
+        if iidx_start is None:
+            iidx_start = 0
+        if iidx_stop is None:
+            iidx_stop = len(self)
+
+        # a view on the counts, no dequantization here
+        out_signal = QuantizedSignal(values=self.get_counts()[int(iidx_start):int(iidx_stop)],
+                                     sampling_freq=self.get_sampling_freq(),
+                                     gain=self.get_gain(),
+                                     offset=self.get_offset(),
+                                     signal_nature=self.get_signal_nature(),
+                                     start_time=self.get_time(iidx_start))
+
+        return self._copy_gaps(out_signal, iidx_start, iidx_stop)
+
+    def to_csv(self, filename, comment=''):
+        self.to_evenly().to_csv(filename, comment)
+
+    def __repr__(self):
+        return Signal.__repr__(self)[:-1] + " freq:" + str(self.get_sampling_freq()) + "Hz gain:" + str(
+            self.get_gain()) + " offset:" + str(self.get_offset()) + ">\n" + self.view(_np.ndarray).__repr__()
+
+
+class SegmentViews(object):
+    """
+    Lazy sequence of portions of a signal, as returned by Signal.segment_many
+    """
+
+    def __init__(self, signal, t_starts, t_stops):
+        self._signal = signal
+        self._t_starts = t_starts
+        self._t_stops = t_stops
+        # one vectorized search for all the bounds
+        self._starts = signal.get_iidx_many(t_starts)
+        self._stops = _np.maximum(signal.get_iidx_many(t_stops), self._starts)
+
+    def get_begin_times(self):
+        return self._t_starts
+
+    def get_end_times(self):
+        return self._t_stops
+
+    def get_starts(self):
+        return self._starts
+
+    def get_stops(self):
+        return self._stops
+
+    def get_lengths(self):
+        return self._stops - self._starts
+
+    def to_array(self, fill_value=_np.nan):
+        """
+        All the portions in a single block, one per row, padded with fill_value (also used for the gaps)
+
+        Returns
+        -------
+        block : numpy.array
+            Array of shape (number of portions, length of the longest portion)
+        """
+        lengths = self.get_lengths()
+        width = int(_np.max(lengths)) if len(lengths) > 0 else 0
+        idx = self._starts[:, None] + _np.arange(width)[None, :]
+        inside = _np.arange(width)[None, :] < lengths[:, None]
+        if self._signal.has_gaps():
+            inside &= self._signal.get_mask()[_np.minimum(idx, len(self._signal) - 1)]
+        values = self._signal.get_values()
+        return _np.where(inside, values[_np.minimum(idx, len(values) - 1)], fill_value)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, i):
+        if isinstance(self._signal, EvenlySignal):
+            return self._signal.segment_iidx(self._starts[i], self._stops[i])
+        else:
+            return self._signal.segment_time(self._t_starts[i], self._t_stops[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class SegmentsBatch(object):
+    """
+    Segments of an evenly spaced signal, held as a single 2-D block (one segment per row, the shorter ones padded
+    with NaN). The block is usually a strided view on the signal (no copy); indicators reduce it along the rows
+    (see Indicator.algorithm_batch).
+    """
+
+    def __init__(self, values, sampling_freq, begins, ends, signal_nature=""):
+        assert values.ndim == 2, "Dimension not 2"
+        assert len(values) == len(begins) == len(ends), "One begin and one end for each segment"
+        self._values = values
+        self._sampling_freq = sampling_freq
+        self._begins = begins
+        self._ends = ends
+        self._signal_nature = signal_nature
+
+    def get_values(self):
+        return self._values
+
+    def get_sampling_freq(self):
+        return self._sampling_freq
+
+    def get_signal_nature(self):
+        return self._signal_nature
+
+    def get_begin_times(self):
+        return self._begins
+
+    def get_end_times(self):
+        return self._ends
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, i):
+        out = EvenlySignal(values=self._values[i],
+                           sampling_freq=self._sampling_freq,
+                           signal_nature=self._signal_nature,
+                           start_time=self._begins[i])
+        # NaNs in the block are gaps or padding
+        missing = _np.isnan(out.get_values())
+        if missing.any():
+            out.set_mask(~missing)
+        return out
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
 class UnevenlySignal(Signal):
     """
     Unevenly spaced signal
@@ -403,6 +896,9 @@ class UnevenlySignal(Signal):
     def get_iidx(self, time):
         return self.get_iidx_from_idx((time - self.get_start_time()) * self.get_sampling_freq())
 
+    def get_iidx_many(self, times):
+        return _np.searchsorted(self.get_indices(), self.get_idx_many(times))
+
     def get_iidx_from_idx(self, idx):
         if idx >= self.get_indices()[0]:
             return int(_np.searchsorted(self.get_indices(), idx))
@@ -437,15 +933,19 @@ class UnevenlySignal(Signal):
         data_x = self.ph[self._MT_X_INDICES]  # From a constant freq range
         data_y = self.get_values()
 
-        # Cubic if needed
-        if kind == 'cubic':
-            tck = _interp.InterpolatedUnivariateSpline(data_x, data_y)
-        else:
-            tck = _interp.interp1d(data_x, data_y, kind=kind)
-
         # Exclusive end, same x_value
         x_out = _np.arange(data_x[0], data_x[-1] + 1)
-        sig_out = tck(x_out)
+
+        if kind in ['linear', 'nearest']:
+            # direct path over the integer grid
+            sig_out = _interp_vectorized(data_x, data_y, x_out, kind)
+        else:
+            # Cubic if needed
+            if kind == 'cubic':
+                tck = _interp.InterpolatedUnivariateSpline(data_x, data_y)
+            else:
+                tck = _interp.interp1d(data_x, data_y, kind=kind)
+            sig_out = tck(x_out)
 
         # Init new signal
         sig_out = EvenlySignal(values=sig_out,
@@ -507,13 +1007,15 @@ class UnevenlySignal(Signal):
         iidx_start = int(iib) if iib is not None else 0
         iidx_stop = int(iie) if iie is not None else -1
 
-        return UnevenlySignal(values=self.get_values()[iidx_start:iidx_stop],
-                              x_values=self.get_indices()[iidx_start:iidx_stop] - idx_start,
-                              sampling_freq=self.get_sampling_freq(),
-                              signal_nature=self.get_signal_nature(),
-                              start_time=self.get_time(idx_start),
-                              x_type='indices',
-                              duration=(idx_stop - idx_start) / self.get_sampling_freq())
+        out_signal = UnevenlySignal(values=self.get_values()[iidx_start:iidx_stop],
+                                    x_values=self.get_indices()[iidx_start:iidx_stop] - idx_start,
+                                    sampling_freq=self.get_sampling_freq(),
+                                    signal_nature=self.get_signal_nature(),
+                                    start_time=self.get_time(idx_start),
+                                    x_type='indices',
+                                    duration=(idx_stop - idx_start) / self.get_sampling_freq())
+
+        return self._copy_gaps(out_signal, iidx_start, iidx_stop)
 
     def segment_iidx(self, iidx_start, iidx_stop=None):
         """
@@ -541,14 +1043,16 @@ class UnevenlySignal(Signal):
             idx_stop = self.get_indices()[-1] + 1
         idx_start = self.get_indices()[int(iidx_start)]
 
-        return UnevenlySignal(values=self.get_values()[int(iidx_start):int(iidx_stop)],
-                              x_values=self.get_indices()[int(iidx_start):int(iidx_stop)]
-                              - self.get_indices()[int(iidx_start)],
-                              sampling_freq=self.get_sampling_freq(),
-                              signal_nature=self.get_signal_nature(),
-                              start_time=self.get_time_from_iidx(iidx_start),
-                              x_type='indices',
-                              duration=(idx_stop - idx_start) / self.get_sampling_freq())
+        out_signal = UnevenlySignal(values=self.get_values()[int(iidx_start):int(iidx_stop)],
+                                    x_values=self.get_indices()[int(iidx_start):int(iidx_stop)]
+                                    - self.get_indices()[int(iidx_start)],
+                                    sampling_freq=self.get_sampling_freq(),
+                                    signal_nature=self.get_signal_nature(),
+                                    start_time=self.get_time_from_iidx(iidx_start),
+                                    x_type='indices',
+                                    duration=(idx_stop - idx_start) / self.get_sampling_freq())
+
+        return self._copy_gaps(out_signal, iidx_start, iidx_stop)
 
     def __repr__(self):
         return Signal.__repr__(self)[:-1] + " time resolution:" + str(1 / self.get_sampling_freq()) + "s>\n" + \
@@ -0,0 +1,189 @@
+# coding=utf-8
+from __future__ import division
+import os as _os
+import numpy as _np
+from abc import abstractmethod as _abstract, ABCMeta as _ABCMeta
+
+__author__ = 'AleB'
+
+
+class Sink(object):
+    """
+    Destination of the rows produced by fmap_stream, one row ([begin, end, label] + values) at a time.
+    """
+    __metaclass__ = _ABCMeta
+
+    def open(self, col_names):
+        """
+        Called once before the first row
+        @param col_names: The names of the columns
+        """
+        pass
+
+    @_abstract
+    def write(self, row):
+        pass
+
+    def close(self):
+        """
+        Called once after the last row
+        """
+        pass
+
+
+class CallbackSink(Sink):
+    """
+    Calls a function for each row.
+
+    Parameters
+    ----------
+    callback : function
+        Function called as callback(row)
+    """
+
+    def __init__(self, callback):
+        self._callback = callback
+
+    def write(self, row):
+        self._callback(row)
+
+
+class CSVSink(Sink):
+    """
+    Writes the rows to a comma separated file, with a header with the column names. Missing labels are left empty.
+
+    Parameters
+    ----------
+    path : str
+        The destination file
+    """
+
+    def __init__(self, path, delimiter=','):
+        self._path = path
+        self._delimiter = delimiter
+        self._file = None
+
+    def open(self, col_names):
+        self._file = open(self._path, 'w')
+        self._file.write(self._delimiter.join(col_names) + '\n')
+
+    def write(self, row):
+        self._file.write(self._delimiter.join('' if x is None else str(x) for x in row) + '\n')
+
+    def close(self):
+        self._file.close()
+        self._file = None
+
+
+class ColumnarSink(Sink):
+    """
+    Writes each column to its own binary file (raw float64) in a directory, the labels to a text file (one per line).
+    Rows are buffered and written block by block. Use ColumnarSink.load to read the columns back.
+
+    Parameters
+    ----------
+    path : str
+        The destination directory
+    block_size : int, >0, default = 1024
+        Number of rows kept in memory before writing
+    """
+
+    _COLUMNS_FILE = "columns.txt"
+    _LABELS_FILE = "label.txt"
+
+    def __init__(self, path, block_size=1024):
+        assert block_size > 0, "The block size has to be positive"
+        self._path = path
+        self._block_size = block_size
+        self._col_names = None
+        self._files = None
+        self._buffer = None
+
+    def open(self, col_names):
+        if not _os.path.isdir(self._path):
+            _os.makedirs(self._path)
+        self._col_names = list(col_names)
+        with open(_os.path.join(self._path, self._COLUMNS_FILE), 'w') as f:
+            f.write('\n'.join(self._col_names) + '\n')
+        self._files = [open(_os.path.join(self._path, self._LABELS_FILE if i == 2 else '%d.bin' % i),
+                            'w' if i == 2 else 'wb') for i in range(len(self._col_names))]
+        self._buffer = []
+
+    def write(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self._block_size:
+            self._flush()
+
+    def _flush(self):
+        for i, f in enumerate(self._files):
+            column = [row[i] for row in self._buffer]
+            if i == 2:
+                f.write(''.join(('' if x is None else str(x)) + '\n' for x in column))
+            else:
+                f.write(_np.array([_np.nan if x is None else x for x in column], dtype='<f8').tobytes())
+        self._buffer = []
+
+    def close(self):
+        self._flush()
+        for f in self._files:
+            f.close()
+        self._files = None
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads the columns written by a ColumnarSink
+
+        Returns
+        -------
+        columns : dict
+            The values of each column (the labels as strings, '' where missing), by column name
+        """
+        with open(_os.path.join(path, cls._COLUMNS_FILE)) as f:
+            col_names = [x for x in f.read().split('\n') if len(x) > 0]
+        columns = {}
+        for i, name in enumerate(col_names):
+            if i == 2:
+                with open(_os.path.join(path, cls._LABELS_FILE)) as f:
+                    columns[name] = _np.array(f.read().split('\n')[:-1])
+            else:
+                columns[name] = _np.fromfile(_os.path.join(path, '%d.bin' % i), dtype='<f8')
+        return columns
+
+
+class TableSink(Sink):
+    """
+    Fills a FeatureTable one row at a time, in a preallocated structured array grown by doubling its capacity.
+    Use get_table after the last row.
+    """
+
+    def __init__(self):
+        self._data = None
+        self._n = 0
+
+    def open(self, col_names):
+        names = []
+        for name in col_names:
+            unique, i = str(name), 1
+            while unique in names:
+                unique = '%s_%d' % (name, i)
+                i += 1
+            names.append(unique)
+        dtype = [(names[0], _np.float64), (names[1], _np.float64), (names[2], object)] + \
+                [(x, _np.float64) for x in names[3:]]
+        self._data = _np.empty(16, dtype=dtype)
+        self._n = 0
+
+    def write(self, row):
+        if self._n == len(self._data):
+            self._data.resize(2 * self._n, refcheck=False)
+        self._data[self._n] = tuple(row[:3]) + tuple(_np.nan if x is None else x for x in row[3:])
+        self._n += 1
+
+    def close(self):
+        # release the unused capacity
+        self._data.resize(self._n, refcheck=False)
+
+    def get_table(self):
+        from .FeatureTable import FeatureTable
+        return FeatureTable(self._data)
@@ -2,6 +2,7 @@
 from __future__ import division
 
 from numpy import array as _array
+import numpy as _np
 
 from .filters import Filters
 from .segmentation import SegmentsGenerators
@@ -9,9 +10,13 @@ from .indicators import FrequencyDomain
 from .indicators import NonLinearDomain
 from .indicators import PeaksDescription
 from .indicators import TimeDomain
-from .BaseSegmentation import Segment
-from .Signal import EvenlySignal, UnevenlySignal, from_pickle, from_pickleable
+from .BaseSegmentation import Segment, PrefetchIterator
+from .BaseIndicator import Indicator as _Indicator
+from .Signal import EvenlySignal, UnevenlySignal, QuantizedSignal, from_pickle, from_pickleable, align
 from .interactive import Annotate
+from .Sinks import Sink, CallbackSink, CSVSink, ColumnarSink, TableSink
+from .FeatureTable import FeatureTable
+from .indicators.Rolling import RollingStats, window_moments
 # BE CAREFUL with NAMES!!!
 from .estimators.Estimators import *
 from .filters.Filters import *
@@ -105,7 +110,8 @@ def preset_tonic(prefix="ton_"):
     return t
 
 
-def fmap(segments, algorithms, alt_signal=None):
+def fmap(segments, algorithms, alt_signal=None, n_jobs=1, chunk_size=None, as_table=False, read_ahead=0,
+         rolling=False):
     # TODO : rename extract_indicators
     """
     Generates a list composed of a list of results for each segment.
@@ -114,17 +120,233 @@ def fmap(segments, algorithms, alt_signal=None):
     :param segments: An iterable of segments (e.g. an initialized SegmentGenerator)
     :param algorithms: A list of algorithms
     :param alt_signal: The signal that will be used instead of the one referenced in the segments
+    :param n_jobs: Number of worker processes (None for one per CPU). The values of the signal are put once in shared
+     memory and read by the workers without copying (with any start method, also 'spawn'), the segments are sent as
+     bounds.
+    :param chunk_size: Number of segments sent to a worker at a time, by default the segments are split evenly among
+     the workers
+    :param as_table: Whether to return a FeatureTable (a typed structured array, filled as the rows are computed)
+     instead of the object matrix
+    :param read_ahead: Number of segments loaded in advance by a background thread (see PrefetchIterator) while
+     computing the algorithms on the current one (serial only), 0 to load each segment when used
+
+    :param rolling: Whether to compute the indicators on overlapping FixedSegments (width > step) of an EvenlySignal
+     updating the result from a window to the next (see Indicator.algorithm_rolling), in a time that does not depend
+     on the overlap for the indicators that support it (e.g. Mean, StDev, Sum, AUC, RMSSD). The results are equal
+     to the ones computed on each segment up to rounding. Serial only.
 
     :return: values, col_names A tuple: matrix (segment x algorithms) containing a value for each
-     algorithm, the list of the algorithm names.
+     algorithm, the list of the algorithm names. A FeatureTable if as_table is True.
     """
     from numpy import asarray as _asarray
-    values = _asarray([[seg.get_begin_time(), seg.get_end_time(), seg.get_label()] +
-                       [alg(seg(alt_signal)) for alg in algorithms] for seg in (
-        segments(alt_signal) if isinstance(segments, SegmentsGenerator) else segments
-    )])
-    col_names = ["begin", "end", "label"] + map(lambda x: x.__repr__(), algorithms)
-    return values, _array(col_names)
+    if isinstance(segments, SegmentsGenerator):
+        segments = segments(alt_signal)
+
+    if n_jobs == 1:
+        values = _fmap_rolling(segments, algorithms) if rolling and read_ahead == 0 else None
+        if values is None:
+            values = ifmap(segments, algorithms, alt_signal, read_ahead)
+    else:
+        values = _fmap_parallel(list(segments), algorithms, alt_signal, n_jobs, chunk_size)
+
+    col_names = ["begin", "end", "label"] + [x.__repr__() for x in algorithms]
+    if as_table:
+        # filled row by row, the rows are not kept
+        return FeatureTable.from_rows(values, col_names)
+    return _asarray(list(values)), _array(col_names)
+
+
+def ifmap(segments, algorithms, alt_signal=None, read_ahead=0):
+    """
+    Generator version of fmap: yields the row [begin, end, label] + [result for each algorithm] of each segment,
+    computing it only when requested.
+
+    :param segments: An iterable of segments (e.g. an initialized SegmentGenerator)
+    :param algorithms: A list of algorithms
+    :param alt_signal: The signal that will be used instead of the one referenced in the segments
+    :param read_ahead: Number of segments loaded in advance by a background thread (see PrefetchIterator), 0 to
+     load each segment when used
+    """
+    if isinstance(segments, SegmentsGenerator):
+        segments = segments(alt_signal)
+    if read_ahead > 0:
+        portions = PrefetchIterator(segments, alt_signal, read_ahead)
+        try:
+            for seg, portion in portions:
+                yield [seg.get_begin_time(), seg.get_end_time(), seg.get_label()] + [alg(portion) for alg in algorithms]
+        finally:
+            portions.close()
+    else:
+        for seg in segments:
+            yield [seg.get_begin_time(), seg.get_end_time(), seg.get_label()] + \
+                [alg(seg(alt_signal)) for alg in algorithms]
+
+
+def fmap_stream(segments, algorithms, sink, alt_signal=None, read_ahead=0):
+    """
+    Computes the rows of fmap one at a time and passes them to a sink (e.g. CSVSink, ColumnarSink, CallbackSink),
+    so that the results are never all kept in memory.
+
+    :param segments: An iterable of segments (e.g. an initialized SegmentGenerator)
+    :param algorithms: A list of algorithms
+    :param sink: The Sink receiving the rows
+    :param alt_signal: The signal that will be used instead of the one referenced in the segments
+    :param read_ahead: Number of segments loaded in advance by a background thread (see PrefetchIterator)
+
+    :return: The number of rows written
+    """
+    n = 0
+    sink.open(["begin", "end", "label"] + [x.__repr__() for x in algorithms])
+    try:
+        for row in ifmap(segments, algorithms, alt_signal, read_ahead):
+            sink.write(row)
+            n += 1
+    finally:
+        sink.close()
+    return n
+
+
+def _fmap_rolling(segments, algorithms):
+    """
+    Serial fmap over overlapping FixedSegments using Indicator.algorithm_rolling.
+    Returns None when the shortcut does not apply (other segmentations, gaps, NaNs, ...).
+    """
+    import numpy as _np
+    if not isinstance(segments, FixedSegments):
+        return None
+    width = segments.get("width")
+    if width is None or width <= segments.get("step"):
+        return None
+    signal = segments.get_signal()
+    if type(signal) is not EvenlySignal or signal.has_gaps() or _np.isnan(signal.get_values()).any():
+        return None
+
+    segs = list(segments)
+    if len(segs) == 0:
+        return []
+    starts = signal.get_idx_many([seg.get_begin_time() for seg in segs])
+    if starts.min() < 0:
+        return None
+    stops = _np.clip(signal.get_idx_many([seg.get_end_time() for seg in segs]), 0, len(signal))
+
+    columns = []
+    for alg in algorithms:
+        if isinstance(alg, _Indicator):
+            column = alg.algorithm_rolling(signal, starts, stops, alg.get())
+        else:
+            column = [alg(seg(signal)) for seg in segs]
+        columns.append(column)
+    return [[seg.get_begin_time(), seg.get_end_time(), seg.get_label()] + [column[i] for column in columns]
+            for i, seg in enumerate(segs)]
+
+
+# Worker side of the parallel fmap: the signal and the algorithms, set once per worker
+_fmap_worker_data = None
+
+
+def _share_signal(signal):
+    """
+    Copies the arrays of the signal (the values and the arrays in its metadata, e.g. the indices of an
+    UnevenlySignal) in shared memory blocks
+    @param signal: The signal
+    @return: The pickleable description of the signal, to rebuild it with _attach_signal, and the blocks (to unlink)
+    """
+    from multiprocessing.shared_memory import SharedMemory as _SharedMemory
+    blocks = []
+
+    def share(array):
+        array = _np.ascontiguousarray(array)
+        block = _SharedMemory(create=True, size=max(array.nbytes, 1))
+        blocks.append(block)
+        _np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        return block.name, array.shape, array.dtype.str
+
+    try:
+        meta = dict(signal.ph)
+        arrays = dict((k, share(v)) for k, v in meta.items() if isinstance(v, _np.ndarray))
+        for k in arrays:
+            del meta[k]
+        return (type(signal), share(signal.get_values()), meta, arrays), blocks
+    except BaseException:
+        for block in blocks:
+            block.close()
+            block.unlink()
+        raise
+
+
+def _attach_signal(shared):
+    """
+    Rebuilds a signal shared with _share_signal, its values are views of the shared memory
+    @param shared: The description returned by _share_signal
+    @return: The signal and the attached blocks (to keep alive while the signal is used)
+    """
+    from multiprocessing.shared_memory import SharedMemory as _SharedMemory
+    cls, values, meta, arrays = shared
+    blocks = []
+
+    def attach(spec):
+        name, shape, dtype = spec
+        block = _SharedMemory(name=name)
+        blocks.append(block)
+        return _np.ndarray(shape, dtype, buffer=block.buf)
+
+    signal = attach(values).view(cls)
+    meta = dict(meta)
+    meta.update((k, attach(v)) for k, v in arrays.items())
+    # as from_pickleable
+    signal._pyphysio = meta
+    signal._mutated = False
+    return signal, blocks
+
+
+def _fmap_init(shared, algorithms):
+    global _fmap_worker_data
+    signal, blocks = _attach_signal(shared)
+    _fmap_worker_data = signal, algorithms, blocks
+
+
+def _fmap_chunk(times):
+    signal, algorithms, blocks = _fmap_worker_data
+    rows = []
+    for begin, end, label in times:
+        portion = Segment(begin, end, label, signal)(signal)
+        rows.append([begin, end, label] + [alg(portion) for alg in algorithms])
+    return rows
+
+
+def _fmap_parallel(segments, algorithms, alt_signal, n_jobs, chunk_size):
+    from multiprocessing import Pool as _Pool, cpu_count as _cpu_count
+    if len(segments) == 0:
+        return []
+
+    signal = alt_signal if alt_signal is not None else segments[0].get_signal()
+    assert alt_signal is not None or all(seg.get_signal() is signal for seg in segments), \
+        "All the segments must refer to the same signal, or alt_signal must be specified"
+
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = _cpu_count()
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(segments) // n_jobs))
+
+    # only the bounds are sent with the segments
+    times = [(seg.get_begin_time(), seg.get_end_time(), seg.get_label()) for seg in segments]
+    chunks = [times[i:i + chunk_size] for i in range(0, len(times), chunk_size)]
+
+    # the signal is sent in shared memory: pickling a Signal (the 'spawn' start method) would drop its metadata
+    shared, blocks = _share_signal(signal)
+    try:
+        pool = _Pool(n_jobs, initializer=_fmap_init, initargs=(shared, algorithms))
+        try:
+            # map keeps the order of the chunks
+            results = pool.map(_fmap_chunk, chunks)
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return [row for rows in results for row in rows]
 
 
 def algo(function, **kwargs):
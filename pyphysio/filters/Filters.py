@@ -1,16 +1,58 @@
 # coding=utf-8
 from __future__ import division
 import numpy as _np
-from scipy.signal import gaussian as _gaussian, filtfilt as _filtfilt, filter_design as _filter_design, \
-    deconvolve as _deconvolve
+from scipy.signal import gaussian as _gaussian, sosfiltfilt as _sosfiltfilt, sosfilt as _sosfilt, \
+    sosfilt_zi as _sosfilt_zi, filter_design as _filter_design, deconvolve as _deconvolve, \
+    fftconvolve as _fftconvolve, oaconvolve as _oaconvolve, resample_poly as _resample_poly
+from scipy.fft import next_fast_len as _next_fast_len
+from hashlib import sha1 as _sha1
+from bisect import bisect_left as _bisect_left, insort as _insort
+from heapq import heappush as _heappush, heappop as _heappop
 from matplotlib.pyplot import plot as _plot
 from ..BaseFilter import Filter as _Filter
-from ..Signal import EvenlySignal as _EvenlySignal, UnevenlySignal as _UnevenlySignal
+from ..Signal import EvenlySignal as _EvenlySignal, UnevenlySignal as _UnevenlySignal, \
+    QuantizedSignal as _QuantizedSignal
 from ..Utility import abstractmethod as _abstract
+from ..indicators.Rolling import RollingStats as _RollingStats
 
 __author__ = 'AleB'
 
 
+def _convolve_full(values, irf):
+    """
+    Full convolution, choosing the method by the sizes: direct for short kernels or signals, overlap-add for kernels
+    much shorter than the signal, FFT otherwise.
+    """
+    n, m = len(values), len(irf)
+    if m <= 16 or n * m <= 1 << 16:
+        return _np.convolve(values, irf, mode='full')
+    elif n >= 8 * m:
+        return _oaconvolve(values, irf, mode='full')
+    else:
+        return _fftconvolve(values, irf, mode='full')
+
+
+def _convolve_hold(values, irf):
+    """
+    Convolution ('same' length, centered as numpy's) of the values extended before the start and after the end
+    by holding the first and the last value. The extension is not built: its contribution is added from the
+    cumulative sum of the IRF.
+    """
+    n, m = len(values), len(irf)
+    c = (m - 1) // 2
+    out = _convolve_full(values, irf)[c:c + n]
+
+    # t + c - j < 0: the IRF samples after t + c meet the first value
+    # t + c - j >= n: the IRF samples up to t + c - n meet the last value
+    cum = _np.cumsum(irf)
+    k = _np.arange(c, c + n)
+    before = k < m
+    out[before] += values[0] * (cum[-1] - cum[k[before]])
+    after = k >= n
+    out[after] += values[-1] * cum[k[after] - n]
+    return out
+
+
 class Normalize(_Filter):
     """
     Normalized the input signal using the general formula: ( signal - BIAS ) / RANGE
@@ -60,6 +102,111 @@ class Normalize(_Filter):
         elif method == "custom":
             return (signal - params['norm_bias']) / params['norm_range']
 
+    def streaming(self, window=None, forgetting=None):
+        """
+        A StreamingNormalize with the parameters of this filter, to normalize data block by block
+        """
+        return StreamingNormalize(window=window, forgetting=forgetting, **self.get())
+
+
+class StreamingNormalize(object):
+    """
+    Normalizes data block by block with running statistics, e.g. on a long recording read in chunks or on
+    real-time data. The statistics (bias and range of Normalize) are updated in a single pass with a numerically
+    stable merge of the mean and variance of each block.
+    After updating with all the blocks of a signal, normalize gives the same results of Normalize on the whole signal.
+
+    Parameters
+    ----------
+    norm_method : str, default = 'standard'
+        Method for the normalization, see Normalize
+
+    Optional parameters
+    -------------------
+    norm_bias : float, default = 0
+        Bias for custom normalization
+    norm_range : float, !=0, default = 1
+        Range for custom normalization
+    window : int, >0
+        Number of most recent samples used for the statistics, by default all the samples so far
+    forgetting : float, (0, 1)
+        Exponential forgetting: the weight of the past samples is multiplied by (1 - forgetting) at each new sample.
+        Only for the 'mean' and 'standard' methods, not with window.
+    """
+
+    def __init__(self, norm_method='standard', norm_bias=0, norm_range=1, window=None, forgetting=None):
+        assert norm_method in ['mean', 'standard', 'min', 'maxmin', 'custom'],\
+            "norm_method must be one of 'mean', 'standard', 'min', 'maxmin', 'custom'"
+        assert norm_method != "custom" or norm_range != 0, "norm_range must not be zero"
+        assert window is None or window > 0, "The window has to be positive"
+        assert forgetting is None or 0 < forgetting < 1, "The forgetting factor has to be in (0, 1)"
+        assert forgetting is None or window is None, "Use either window or forgetting"
+        assert forgetting is None or norm_method in ['mean', 'standard'], \
+            "Forgetting is available for the 'mean' and 'standard' methods"
+        self._method = norm_method
+        self._bias = norm_bias
+        self._range = norm_range
+        self._window = window
+        self._forgetting = forgetting
+        self._stats = _RollingStats()
+        self._min = _np.inf
+        self._max = -_np.inf
+        self._buffer = _np.zeros(0)
+
+    def update(self, block):
+        """
+        Updates the statistics with a block of samples (NaNs are ignored)
+        """
+        values = _np.asarray(block, dtype=float)
+        values = values[~_np.isnan(values)]
+        if self._method == "custom" or len(values) == 0:
+            return
+
+        if self._window is not None:
+            self._buffer = _np.r_[self._buffer, values][-self._window:]
+            values = self._buffer
+            self._stats = _RollingStats()
+            self._min, self._max = _np.min(values), _np.max(values)
+        else:
+            self._min = min(self._min, _np.min(values))
+            self._max = max(self._max, _np.max(values))
+
+        if self._forgetting is not None:
+            keep = 1 - self._forgetting
+            self._stats.scale(keep ** len(values))
+            self._stats.add_many(values, keep ** _np.arange(len(values) - 1, -1, -1))
+        else:
+            self._stats.add_many(values)
+
+    def get_bias(self):
+        if self._method in ["mean", "standard"]:
+            return self._stats.get_mean()
+        elif self._method in ["min", "maxmin"]:
+            return self._min
+        return self._bias
+
+    def get_range(self):
+        if self._method == "standard":
+            return self._stats.get_std()
+        elif self._method == "maxmin":
+            return self._max - self._min
+        elif self._method == "custom":
+            return self._range
+        return 1
+
+    def normalize(self, block):
+        """
+        Normalizes a block of samples with the current statistics
+        """
+        return (block - self.get_bias()) / self.get_range()
+
+    def process(self, block):
+        """
+        Updates the statistics with a block of samples and normalizes it
+        """
+        self.update(block)
+        return self.normalize(block)
+
 
 class Diff(_Filter):
     """
@@ -77,6 +224,8 @@ class Diff(_Filter):
 
     """
 
+    _quantized = True
+
     def __init__(self, degree=1):
         assert degree > 0, "The degree value should be positive"
         _Filter.__init__(self, degree=degree)
@@ -88,16 +237,36 @@ class Diff(_Filter):
         """
         degree = params['degree']
 
-        sig_1 = signal[:-degree]
-        sig_2 = signal[degree:]
+        if isinstance(signal, _QuantizedSignal):
+            # differences of counts, in a type twice as wide (up to 64 bits) to avoid overflows; the offset cancels
+            counts = signal.get_counts()
+            wide = _np.int32 if counts.dtype.itemsize <= 2 else _np.int64
+            out = _QuantizedSignal(values=_np.subtract(counts[degree:], counts[:-degree], dtype=wide),
+                                   sampling_freq=signal.get_sampling_freq(),
+                                   gain=signal.get_gain(),
+                                   offset=0,
+                                   signal_nature=signal.get_signal_nature(),
+                                   start_time=signal.get_start_time() + degree / signal.get_sampling_freq())
+        else:
+            sig_1 = signal[:-degree]
+            sig_2 = signal[degree:]
+
+            out = _EvenlySignal(values=sig_2 - sig_1,
+                                sampling_freq=signal.get_sampling_freq(),
+                                signal_nature=signal.get_signal_nature(),
+                                start_time=signal.get_start_time() + degree / signal.get_sampling_freq())
 
-        out = _EvenlySignal(values=sig_2 - sig_1,
-                            sampling_freq=signal.get_sampling_freq(),
-                            signal_nature=signal.get_signal_nature(),
-                            start_time=signal.get_start_time() + degree / signal.get_sampling_freq())
+        if signal.has_gaps():
+            # a difference is missing if any of its two samples is
+            gaps = signal.get_gaps()
+            out.set_gaps(_np.c_[gaps[:, 0] - degree, gaps[:, 1]])
 
         return out
 
+    @classmethod
+    def get_chunk_overlap(cls, signal, params):
+        return params['degree']
+
 
 class IIRFilter(_Filter):
     """
@@ -118,6 +287,13 @@ class IIRFilter(_Filter):
         Minimum attenuation required in the stop band.
     ftype : str, default = 'butter'
         Type of filter. Available types: 'butter', 'cheby1', 'cheby2', 'ellip', 'bessel'
+    multirate : bool, default = False
+        Whether to filter on a decimated signal when the upper stop frequency is far below the Nyquist frequency
+        (see get_decimation_factor). The decimation and the interpolation use zero phase polyphase FIR filters.
+        Equivalent within tolerance; faster for high order filters.
+    interpolate : bool, default = True
+        In multirate mode, whether to interpolate the result back to the sampling frequency of the signal (else
+        the decimated signal is returned)
 
     Returns
     -------
@@ -127,16 +303,23 @@ class IIRFilter(_Filter):
     Notes
     -----
     This is a wrapper of *scipy.signal.filter_design.iirdesign*. Refer to `scipy.signal.filter_design.iirdesign`
-    for additional information
+    for additional information. The filter is designed once for each set of parameters and sampling frequency and is
+    applied forward and backward (zero phase) as second-order sections, which stay stable at high orders.
     """
 
-    def __init__(self, fp, fs, loss=.1, att=40, ftype='butter'):
+    _split_gaps = True
+
+    # minimum ratio between the decimated sampling frequency and the upper stop frequency
+    _decimation_margin = 5
+
+    def __init__(self, fp, fs, loss=.1, att=40, ftype='butter', multirate=False, interpolate=True):
         assert loss > 0, "Loss value should be positive"
         assert att > 0, "Attenuation value should be positive"
         assert att > loss, "Attenuation value should be greater than loss value"
         assert ftype in ['butter', 'cheby1', 'cheby2', 'ellip', 'bessel'],\
             "Filter type must be in ['butter', 'cheby1', 'cheby2', 'ellip', 'bessel']"
-        _Filter.__init__(self, fp=fp, fs=fs, loss=loss, att=att, ftype=ftype)
+        _Filter.__init__(self, fp=fp, fs=fs, loss=loss, att=att, ftype=ftype, multirate=multirate,
+                         interpolate=interpolate)
 
     @classmethod
     def algorithm(cls, signal, params):
@@ -147,16 +330,28 @@ class IIRFilter(_Filter):
             cls.warn('Filtering Unevenly signal is undefined. Returning original signal.')
             return signal
 
-        nyq = 0.5 * fsamp
-        fp = _np.array(fp)
-        fs = _np.array(fs)
-
-        wp = fp / nyq
-        ws = fs / nyq
-        # noinspection PyTupleAssignmentBalance
-        b, a = _filter_design.iirdesign(wp, ws, loss, att, ftype=ftype, output="ba")
+        q = cls.get_decimation_factor(fsamp, fp, fs) if params["multirate"] else 1
+        if q > 1:
+            sos = cls.design(fsamp / q, fp, fs, loss, att, ftype)
+            values = cls.decimate(signal.get_values(), q)
+            if len(values) > 3 * (2 * len(sos) + 1):
+                values = _sosfiltfilt(sos, values)
+                if params["interpolate"]:
+                    values = cls.interpolate(values, q, len(signal))
+                else:
+                    fsamp = fsamp / q
+                return _EvenlySignal(values, sampling_freq=fsamp, signal_nature=signal.get_signal_nature(),
+                                     start_time=signal.get_start_time())
+            # too short once decimated: at the full rate
+
+        sos = cls.design(fsamp, fp, fs, loss, att, ftype)
+
+        # same as the default padding of sosfiltfilt
+        if len(signal) <= 3 * (2 * len(sos) + 1):
+            cls.warn('Signal too short for the filter. Returning original signal.')
+            return signal
 
-        sig_filtered = _EvenlySignal(_filtfilt(b, a, signal.get_values()), sampling_freq=signal.get_sampling_freq(),
+        sig_filtered = _EvenlySignal(_sosfiltfilt(sos, signal.get_values()), sampling_freq=signal.get_sampling_freq(),
                                      signal_nature=signal.get_signal_nature(), start_time=signal.get_start_time())
 
         if _np.isnan(sig_filtered[0]):
@@ -165,11 +360,224 @@ class IIRFilter(_Filter):
         else:
             return sig_filtered
 
+    # designed filters (second-order sections), by design parameters
+    _designs = {}
+    _designs_max = 256
+
+    @classmethod
+    def design(cls, fsamp, fp, fs, loss, att, ftype):
+        """
+        Designs the filter as second-order sections. The result is cached for each set of parameters.
+        @return: The second-order sections (n x 6 array), not to be modified
+        """
+        key = (float(fsamp), tuple(_np.ravel(fp).astype(float)), tuple(_np.ravel(fs).astype(float)), float(loss),
+               float(att), ftype)
+        sos = cls._designs.get(key)
+        if sos is None:
+            nyq = 0.5 * fsamp
+            wp = _np.array(fp) / nyq
+            ws = _np.array(fs) / nyq
+            sos = _filter_design.iirdesign(wp, ws, loss, att, ftype=ftype, output="sos")
+            if len(cls._designs) >= cls._designs_max:
+                cls._designs.clear()
+            cls._designs[key] = sos
+        return sos
+
+    def streaming(self, sampling_freq, look_ahead=0):
+        """
+        A StreamingIIRFilter with the parameters of this filter, to filter data block by block
+        """
+        return StreamingIIRFilter(self, sampling_freq, look_ahead)
+
+    @classmethod
+    def get_decimation_factor(cls, fsamp, fp, fs):
+        """
+        Largest power of 2 by which the signal can be decimated keeping the sampling frequency above
+        _decimation_margin times the upper stop frequency. 1 without an upper stop band (high pass, band stop).
+        """
+        fp = _np.ravel(fp)
+        fs = _np.ravel(fs)
+        if _np.max(fp) >= _np.max(fs):
+            return 1
+        q = 1
+        while fsamp / (2 * q) >= cls._decimation_margin * _np.max(fs):
+            q *= 2
+        return q
+
+    @staticmethod
+    def decimate(values, q):
+        """
+        Anti-alias filtering (zero phase) and decimation by q. The edges are extended linearly.
+        """
+        return _resample_poly(_np.asarray(values, dtype=float), 1, q, padtype='line')
+
+    @staticmethod
+    def interpolate(values, q, n):
+        """
+        Interpolation by q of decimated values, back to n samples. The edges are extended linearly.
+        """
+        return _resample_poly(values, q, 1, padtype='line')[:n]
+
+    # relative amplitude below which the transient of the filter is negligible
+    _transient_tolerance = 1e-12
+
+    @classmethod
+    def get_transient_length(cls, sos):
+        """
+        Number of samples after which the impulse response of the filter stays below _transient_tolerance times its
+        peak, None if the filter is unstable
+        """
+        radius = max(_np.max(_np.abs(_np.roots(section[3:]))) if section[4] != 0 or section[5] != 0 else 0
+                     for section in sos)
+        if radius >= 1:
+            return None
+        if radius == 0:
+            return len(sos) * 2
+        # upper bound from the slowest pole, checked on the impulse response (repeated poles decay slower)
+        n = int(_np.ceil(_np.log(cls._transient_tolerance) / _np.log(radius))) + 1
+        while True:
+            h = _np.abs(_sosfilt(sos, _np.r_[1., _np.zeros(2 * n - 1)]))
+            above = _np.where(h > cls._transient_tolerance * _np.max(h))[0]
+            if len(above) == 0 or above[-1] < n:
+                return above[-1] + 1 if len(above) > 0 else 1
+            n *= 2
+
+    @classmethod
+    def get_chunk_overlap(cls, signal, params):
+        fsamp = signal.get_sampling_freq()
+        fp, fs, loss, att, ftype = params["fp"], params["fs"], params["loss"], params["att"], params["ftype"]
+        q = cls.get_decimation_factor(fsamp, fp, fs) if params["multirate"] else 1
+        n = cls.get_transient_length(cls.design(fsamp / q, fp, fs, loss, att, ftype))
+        if n is None:
+            return None
+        if q > 1:
+            # plus the FIR filters of the decimation and of the interpolation (half length 10 * q each).
+            # Near the edges of the signal the result still depends on its last and first values (linear extension)
+            return q * (n + 2) + 20 * q
+        return n
+
+    @classmethod
+    def get_chunk_alignment(cls, signal, params):
+        # same decimation phase as the whole signal
+        if params["multirate"]:
+            return cls.get_decimation_factor(signal.get_sampling_freq(), params["fp"], params["fs"])
+        return 1
+
     @_abstract
     def plot(self):
         pass
 
 
+class StreamingIIRFilter(object):
+    """
+    Applies the filter of an IIRFilter block by block, e.g. on a long recording read in chunks or on real-time data.
+    The state of the filter is kept between the calls to process, so the cost is proportional to the block length.
+
+    With look_ahead = 0 the filter is causal (forward only, not zero phase) and each block is returned at once.
+    With look_ahead > 0 the output approximates the zero phase filtering of IIRFilter: the backward pass is run on
+    the forward output of each block plus the following look_ahead seconds, so the output is delayed by look_ahead
+    (the samples of the last look_ahead seconds are returned by the next calls or by flush).
+
+    Parameters
+    ----------
+    iir_filter : IIRFilter
+        The filter to apply
+    sampling_freq : float, >0
+        Sampling frequency of the data
+
+    Optional parameters
+    -------------------
+    look_ahead : float, >=0, default = 0
+        Latency allowed for the zero phase approximation, in seconds. Longer is more accurate.
+    """
+
+    def __init__(self, iir_filter, sampling_freq, look_ahead=0):
+        assert isinstance(iir_filter, IIRFilter), "An IIRFilter is needed"
+        assert sampling_freq > 0, "The sampling frequency cannot be zero or negative"
+        assert look_ahead >= 0, "The look ahead cannot be negative"
+        p = iir_filter.get()
+        self._sos = IIRFilter.design(sampling_freq, p["fp"], p["fs"], p["loss"], p["att"], p["ftype"])
+        self._zi_unit = _sosfilt_zi(self._sos)
+        self._fsamp = sampling_freq
+        self._look_ahead = int(round(look_ahead * sampling_freq))
+        self._zi = None
+        self._pending = None
+        self._start_time = None
+        self._n_out = 0
+
+    def get_latency(self):
+        """
+        Delay of the output, in samples
+        """
+        return self._look_ahead
+
+    def reset(self):
+        """
+        Forgets the state, the next block starts a new stream
+        """
+        self._zi = None
+        self._pending = None
+        self._start_time = None
+        self._n_out = 0
+
+    def process(self, block):
+        """
+        Filters the next block of samples
+
+        Parameters
+        ----------
+        block : array or EvenlySignal
+            The next samples
+
+        Returns
+        -------
+        filtered : array or EvenlySignal
+            The filtered samples available (the whole block if look_ahead is 0). An EvenlySignal, with the start time
+            of its first sample, if the block is an EvenlySignal.
+        """
+        values = _np.asarray(block, dtype=float)
+        if self._zi is None:
+            if len(values) == 0:
+                return block
+            # steady state for the first value
+            self._zi = self._zi_unit * values[0]
+            self._pending = _np.zeros(0)
+            self._start_time = block.get_start_time() if isinstance(block, _EvenlySignal) else 0
+
+        forward, self._zi = _sosfilt(self._sos, values, zi=self._zi)
+        if self._look_ahead == 0:
+            return self._output(block, forward)
+
+        pending = _np.concatenate([self._pending, forward])
+        n = len(pending) - self._look_ahead
+        if n <= 0:
+            self._pending = pending
+            return self._output(block, _np.zeros(0))
+        self._pending = pending[n:]
+        return self._output(block, self._backward(pending)[:n])
+
+    def flush(self):
+        """
+        Returns the samples kept for the look ahead, filtered backward without the following samples, and resets
+        the stream.
+        """
+        out = self._backward(self._pending) if self._pending is not None and len(self._pending) > 0 else _np.zeros(0)
+        self.reset()
+        return out
+
+    def _backward(self, forward):
+        backward, ignored = _sosfilt(self._sos, forward[::-1], zi=self._zi_unit * forward[-1])
+        return backward[::-1]
+
+    def _output(self, block, values):
+        start = self._n_out
+        self._n_out += len(values)
+        if isinstance(block, _EvenlySignal):
+            return _EvenlySignal(values, sampling_freq=self._fsamp, signal_nature=block.get_signal_nature(),
+                                 start_time=self._start_time + start / self._fsamp)
+        return values
+
+
 class DenoiseEDA(_Filter):
     """
     Remove noise due to sensor displacement from the EDA signal.
@@ -189,7 +597,11 @@ class DenoiseEDA(_Filter):
     -------
     signal : EvenlySignal
         De-noised signal
-            
+
+    Notes
+    -----
+    The signal is processed in chunks (with an overlap of win_len), so that the temporary data does not depend on its
+    length. Only the noisy portions are replaced, by linear interpolation.
     """
 
     def __init__(self, threshold, win_len=2):
@@ -197,30 +609,68 @@ class DenoiseEDA(_Filter):
         assert win_len > 0, "Window length value should be positive"
         _Filter.__init__(self, threshold=threshold, win_len=win_len)
 
+    # number of samples processed at a time
+    _chunk_size = 1 << 16
+
     @classmethod
     def algorithm(cls, signal, params):
         threshold = params['threshold']
         win_len = params['win_len']
-
-        # remove fluctiations
-        noise = ConvolutionalFilter(irftype='triang', win_len=win_len, normalize=True)(abs(_np.diff(signal)))
-
-        # identify noisy portions
-        idx_ok = _np.where(noise <= threshold)[0]
-
-        # fix start and stop of the signal for the following interpolation
-        if idx_ok[0] != 0:
-            idx_ok = _np.r_[0, idx_ok].astype(int)
-
-        if idx_ok[-1] != len(signal) - 1:
-            idx_ok = _np.r_[idx_ok, len(signal) - 1].astype(int)
-
-        denoised = _UnevenlySignal(signal[idx_ok], signal.get_sampling_freq(), x_values=idx_ok, x_type='indices',
-                                   duration=signal.get_duration())
-
-        # interpolation
-        signal_out = denoised.to_evenly('linear')
-        return signal_out
+        fsamp = signal.get_sampling_freq()
+        smooth = ConvolutionalFilter(irftype='triang', win_len=win_len, normalize=True)
+
+        values = signal.get_values()
+        n = len(values)
+        out = _np.array(values, dtype=float)
+
+        # the noise of the chunk [a, b) depends on the differences within the window length
+        overlap = int(win_len * fsamp) + 1
+        last_ok = 0
+        pending = None
+        for a in range(0, n - 1, cls._chunk_size):
+            b = min(a + cls._chunk_size, n - 1)
+            lo = max(a - overlap, 0)
+            hi = min(b + overlap, n - 1)
+
+            # remove fluctuations
+            noise = smooth(_EvenlySignal(_np.abs(_np.diff(values[lo:hi + 1])), fsamp))[a - lo:b - lo]
+
+            # identify noisy portions, the first and the last samples are kept for the interpolation
+            ok = noise <= threshold
+            if a == 0:
+                ok[0] = True
+            idx = _np.arange(a, b)
+            ok_idx = idx[ok]
+
+            if pending is not None and len(ok_idx) > 0:
+                # noisy span started in a previous chunk
+                cls._interpolate(values, out, last_ok, ok_idx[0], pending, a)
+                pending = None
+
+            # interpolation across the noisy spans with both ends in the chunk
+            prev = _np.maximum.accumulate(_np.where(ok, idx, last_ok))
+            nxt = _np.minimum.accumulate(_np.where(ok, idx, n)[::-1])[::-1]
+            fill = ~ok & (nxt < n)
+            cls._interpolate(values, out, prev[fill], nxt[fill], idx[fill])
+
+            if len(ok_idx) > 0:
+                last_ok = ok_idx[-1]
+                if not ok[-1]:
+                    pending = ok_idx[-1] + 1
+            elif pending is None:
+                pending = a
+
+        if pending is not None:
+            cls._interpolate(values, out, last_ok, n - 1, pending, n - 1)
+
+        return _EvenlySignal(out, sampling_freq=fsamp, signal_nature=signal.get_signal_nature(),
+                             start_time=signal.get_start_time())
+
+    @staticmethod
+    def _interpolate(values, out, p, q, start, stop=None):
+        # linear interpolation between the samples p and q, at start (array) or at [start, stop)
+        x = start if stop is None else _np.arange(start, stop)
+        out[x] = values[p] + (values[q] - values[p]) * (x - p) / (q - p)
 
 
 class ConvolutionalFilter(_Filter):
@@ -248,6 +698,8 @@ class ConvolutionalFilter(_Filter):
 
     """
 
+    _split_gaps = True
+
     def __init__(self, irftype, win_len=0, irf=None, normalize=True):
         assert irftype in ['gauss', 'rect', 'triang', 'dgauss', 'custom'],\
             "IRF type must be in ['gauss', 'rect', 'triang', 'dgauss', 'custom']"
@@ -302,14 +754,19 @@ class ConvolutionalFilter(_Filter):
         if normalize:
             irf = irf / _np.sum(irf)
 
-        signal_ = _np.r_[_np.ones(n) * signal[0], signal, _np.ones(n) * signal[-1]]  # TESTME
+        # edges held at the first and last values
+        signal_f = _convolve_hold(_np.asarray(signal.get_values(), dtype=float), irf)
 
-        signal_f = _np.convolve(signal_, irf, mode='same')
-
-        signal_out = _EvenlySignal(signal_f[n:-n], sampling_freq=signal.get_sampling_freq(),
+        signal_out = _EvenlySignal(signal_f, sampling_freq=signal.get_sampling_freq(),
                                    signal_nature=signal.get_signal_nature(), start_time=signal.get_start_time())
         return signal_out
 
+    @classmethod
+    def get_chunk_overlap(cls, signal, params):
+        if params["irftype"] == 'custom':
+            return len(params["irf"])
+        return int(params['win_len'] * signal.get_sampling_freq())
+
     @classmethod
     def plot(cls):
         pass
@@ -330,8 +787,8 @@ class DeConvolutionalFilter(_Filter):
     normalize : boolean, default = True
         Whether to normalize the IRF to have unitary area
     deconv_method : str, default = 'sps'
-        Available methods: 'fft', 'sps'. 'fft' uses the fourier transform, 'sps' uses the scipy.signal.deconvolve
-         function
+        Available methods: 'fft', 'sps'. 'fft' uses the fourier transform (real FFT, padded with zeros to a fast
+         length, with the IRF spectra cached), 'sps' uses the scipy.signal.deconvolve function
         
     Returns
     -------
@@ -355,9 +812,10 @@ class DeConvolutionalFilter(_Filter):
             irf = irf / _np.sum(irf)
         if deconvolution_method == 'fft':
             l = len(signal)
-            fft_signal = _np.fft.fft(signal, n=l)
-            fft_irf = _np.fft.fft(irf, n=l)
-            out = _np.fft.ifft(fft_signal / fft_irf)
+            # zero padded to a length with small prime factors
+            n = _next_fast_len(l, True)
+            fft_signal = _np.fft.rfft(signal.get_values(), n=n)
+            out = _np.fft.irfft(fft_signal / cls.irf_spectrum(irf, n), n=n)[:l]
         elif deconvolution_method == 'sps':
             cls.warn('sps based deconvolution needs to be tested. Use carefully.')
             out, _ = _deconvolve(signal, irf)
@@ -370,5 +828,255 @@ class DeConvolutionalFilter(_Filter):
 
         return out_signal
 
+    # real FFTs of the IRFs, by (digest of the IRF, length)
+    _spectra = {}
+    _spectra_max = 64
+
+    @classmethod
+    def irf_spectrum(cls, irf, n):
+        """
+        Real FFT of the IRF at length n. The result is cached for each IRF (by content) and length.
+        @return: The spectrum, not to be modified
+        """
+        irf = _np.ascontiguousarray(irf, dtype=float)
+        key = (_sha1(irf.tobytes()).hexdigest(), len(irf), n)
+        spectrum = cls._spectra.get(key)
+        if spectrum is None:
+            spectrum = _np.fft.rfft(irf, n=n)
+            if len(cls._spectra) >= cls._spectra_max:
+                cls._spectra.clear()
+            cls._spectra[key] = spectrum
+        return spectrum
+
     def plot(self):
         _plot(self._params['irf'])
+
+
+def _running_median(values, half):
+    """
+    Median of the 2 * half + 1 values centered on each sample, the values beyond the edges are held at the first and
+    the last value. The window is split in two heaps, the lower half (max-heap) and the upper half (min-heap), the
+    median is the top of the lower half. The values leaving the window are only marked as removed, and dropped when
+    they reach the top of a heap (lazy deletion): each step costs O(log(half)) amortized.
+    """
+    n = len(values)
+    low, high = [], []  # low holds the negated values
+    removed = {}
+    # number of valid values in low minus in high: 1 after each step (odd window)
+    balance = 0
+
+    def prune(heap, sign):
+        while heap and removed.get(sign * heap[0], 0) > 0:
+            removed[sign * heap[0]] -= 1
+            _heappop(heap)
+
+    def add(x):
+        if not low or x <= -low[0]:
+            _heappush(low, -x)
+            return 1
+        _heappush(high, x)
+        return -1
+
+    for j in range(-half, half + 1):
+        balance += add(values[min(max(j, 0), n - 1)])
+        while balance > 1:
+            _heappush(high, -_heappop(low))
+            balance -= 2
+        while balance < 0:
+            _heappush(low, -_heappop(high))
+            balance += 2
+
+    out = [-low[0]]
+    for i in range(1, n):
+        balance += add(values[min(i + half, n - 1)])
+
+        x = values[max(i - half - 1, 0)]
+        removed[x] = removed.get(x, 0) + 1
+        if x <= -low[0]:
+            balance -= 1
+            if x == -low[0]:
+                prune(low, -1)
+        else:
+            balance += 1
+            if x == high[0]:
+                prune(high, 1)
+
+        if balance > 1:
+            _heappush(high, -_heappop(low))
+            balance -= 2
+            prune(low, -1)
+        elif balance < 1:
+            prune(high, 1)
+            _heappush(low, -_heappop(high))
+            balance += 2
+            prune(high, 1)
+        prune(low, -1)
+        out.append(-low[0])
+    return out
+
+
+def _sorted_windows(values, half):
+    """
+    Sorted window of the 2 * half + 1 values centered on each sample, the values beyond the edges are held at the first
+    and the last value. The same list is updated (one bisect removal and one insertion per sample) and yielded at each
+    step: O(log(half)) comparisons, but also a shift of O(half) elements of the list (a memory move).
+    """
+    n = len(values)
+    window = sorted([values[0]] * (half + 1) + [values[min(j, n - 1)] for j in range(1, half + 1)])
+    yield window
+    for i in range(1, n):
+        del window[_bisect_left(window, values[max(i - half - 1, 0)])]
+        _insort(window, values[min(i + half, n - 1)])
+        yield window
+
+
+def _median_deviation(window, median):
+    """
+    Median of the absolute deviations of the (sorted, odd length) window from its median, in O(log(len(window))):
+    the deviations below and above the median are two sorted sequences, the k-th smallest of their union is found by
+    bisection.
+    """
+    k = len(window) // 2
+    p = _bisect_left(window, median)
+    na, nb = p, len(window) - p
+
+    # a[i] = median - window[p - 1 - i], b[j] = window[p + j] - median
+    lo, hi = max(0, k + 1 - nb), min(k + 1, na)
+    while lo < hi:
+        i = (lo + hi) // 2
+        if median - window[p - 1 - i] < window[p + k - i] - median:
+            lo = i + 1
+        else:
+            hi = i
+    j = k + 1 - lo
+    a = median - window[p - lo] if lo > 0 else -_np.inf
+    b = window[p + j - 1] - median if j > 0 else -_np.inf
+    return max(a, b)
+
+
+class RunningMedian(_Filter):
+    """
+    Replace each sample with the median of the window centered on it (the values beyond the edges are held at the first
+    and the last value). The window is split in two heaps with lazy deletion, each step costs O(log(win_len))
+    (amortized).
+
+    Parameters
+    ----------
+    win_len : float, >0
+        Duration of the window in seconds (rounded to an odd number of samples)
+
+    Returns
+    -------
+    signal : EvenlySignal
+        Filtered signal
+
+    Notes
+    -----
+    Use running_median to filter arrays, also with more channels (samples x channels).
+    """
+
+    _split_gaps = True
+
+    def __init__(self, win_len):
+        assert win_len > 0, "Window length value should be positive"
+        _Filter.__init__(self, win_len=win_len)
+
+    @classmethod
+    def algorithm(cls, signal, params):
+        half = int(params['win_len'] * signal.get_sampling_freq()) // 2
+        return _EvenlySignal(cls.running_median(signal.get_values(), half), sampling_freq=signal.get_sampling_freq(),
+                             signal_nature=signal.get_signal_nature(), start_time=signal.get_start_time())
+
+    @classmethod
+    def get_chunk_overlap(cls, signal, params):
+        return int(params['win_len'] * signal.get_sampling_freq()) // 2
+
+    @staticmethod
+    def running_median(values, half):
+        """
+        Running median of an array, on windows of 2 * half + 1 samples
+        @param values: The values (no NaNs), 1-d or 2-d (samples x channels)
+        @param half: Number of samples of the window on each side
+        @return: Array of the same shape
+        """
+        values = _np.asarray(values, dtype=float)
+        if values.ndim == 2:
+            return _np.column_stack([RunningMedian.running_median(values[:, c], half) for c in
+                                     range(values.shape[1])]).reshape(values.shape)
+        if len(values) == 0:
+            return values.copy()
+        return _np.array(_running_median(values.tolist(), half))
+
+
+class Hampel(_Filter):
+    """
+    Hampel filter: replace the outliers with the median of the window centered on them. A sample is an outlier when its
+    distance from the median is more than n_sigma times the standard deviation estimated with the median absolute
+    deviation (1.4826 * MAD) of the window. The window is kept in a sorted list: each step costs O(log(win_len))
+    comparisons for the median and the MAD, plus an O(win_len) shift of the list to update it (a memory move, fast
+    in practice but linear in the window length).
+
+    Parameters
+    ----------
+    win_len : float, >0
+        Duration of the window in seconds (rounded to an odd number of samples)
+
+    Optional parameters
+    -------------------
+    n_sigma : float, >=0, default = 3
+        Threshold, in estimated standard deviations
+
+    Returns
+    -------
+    signal : EvenlySignal
+        Filtered signal
+
+    Notes
+    -----
+    Use hampel to filter arrays, also with more channels (samples x channels).
+    """
+
+    _split_gaps = True
+
+    # MAD to standard deviation, for normally distributed data
+    _mad_scale = 1.4826
+
+    def __init__(self, win_len, n_sigma=3):
+        assert win_len > 0, "Window length value should be positive"
+        assert n_sigma >= 0, "n_sigma should be non negative"
+        _Filter.__init__(self, win_len=win_len, n_sigma=n_sigma)
+
+    @classmethod
+    def algorithm(cls, signal, params):
+        half = int(params['win_len'] * signal.get_sampling_freq()) // 2
+        return _EvenlySignal(cls.hampel(signal.get_values(), half, params['n_sigma']),
+                             sampling_freq=signal.get_sampling_freq(), signal_nature=signal.get_signal_nature(),
+                             start_time=signal.get_start_time())
+
+    @classmethod
+    def get_chunk_overlap(cls, signal, params):
+        return int(params['win_len'] * signal.get_sampling_freq()) // 2
+
+    @classmethod
+    def hampel(cls, values, half, n_sigma=3):
+        """
+        Hampel filter of an array, on windows of 2 * half + 1 samples
+        @param values: The values (no NaNs), 1-d or 2-d (samples x channels)
+        @param half: Number of samples of the window on each side
+        @param n_sigma: Threshold, in estimated standard deviations
+        @return: Array of the same shape
+        """
+        values = _np.asarray(values, dtype=float)
+        if values.ndim == 2:
+            return _np.column_stack([cls.hampel(values[:, c], half, n_sigma) for c in
+                                     range(values.shape[1])]).reshape(values.shape)
+        if len(values) == 0:
+            return values.copy()
+        threshold = n_sigma * cls._mad_scale
+        out = values.tolist()
+        for i, w in enumerate(_sorted_windows(values.tolist(), half)):
+            median = w[half]
+            # the MAD is only needed when the sample is not the median
+            if out[i] != median and abs(out[i] - median) > threshold * _median_deviation(w, median):
+                out[i] = median
+        return _np.array(out)
@@ -0,0 +1,189 @@
+# coding=utf-8
+from __future__ import division
+import numpy as _np
+
+__author__ = 'AleB'
+
+
+class RollingStats(object):
+    """
+    Count, mean and variance of a window of values that changes by adding and removing single values, each update
+    in O(1). The updates follow Welford's algorithm (running mean and sum of squared deviations), which does not
+    suffer the cancellation of the sum / sum of squares formulas.
+    """
+
+    def __init__(self):
+        self._n = 0
+        self._mean = 0.
+        self._m2 = 0.
+
+    def add(self, x):
+        self._n += 1
+        d = x - self._mean
+        self._mean += d / self._n
+        self._m2 += d * (x - self._mean)
+
+    def remove(self, x):
+        assert self._n > 0, "Removing from an empty window"
+        self._n -= 1
+        if self._n == 0:
+            self._mean = 0.
+            self._m2 = 0.
+        else:
+            d = x - self._mean
+            self._mean -= d / self._n
+            self._m2 -= d * (x - self._mean)
+
+    def add_many(self, values, weights=None):
+        """
+        Adds a block of values at once, merging its mean and variance with the ones of the window (Chan et al.)
+
+        Parameters
+        ----------
+        values : numpy.array
+            The values to add
+        weights : numpy.array
+            Weight of each value, by default 1
+        """
+        values = _np.asarray(values, dtype=float)
+        if weights is None:
+            w = len(values)
+            if w == 0:
+                return
+            mean = values.sum() / w
+            dev = values - mean
+            m2 = _np.dot(dev, dev)
+        else:
+            w = _np.sum(weights)
+            if w <= 0:
+                return
+            mean = _np.sum(weights * values) / w
+            m2 = _np.sum(weights * (values - mean) ** 2)
+
+        n = self._n + w
+        d = mean - self._mean
+        self._mean += d * w / n
+        self._m2 += m2 + d * d * self._n * w / n
+        self._n = n
+
+    def remove_many(self, values):
+        """
+        Removes a block of values at once (the inverse of add_many)
+
+        Parameters
+        ----------
+        values : numpy.array
+            The values to remove, previously added
+        """
+        values = _np.asarray(values, dtype=float)
+        w = len(values)
+        if w == 0:
+            return
+        assert w <= self._n, "Removing more values than the window has"
+        if w == self._n:
+            self.__init__()
+            return
+        mean = values.sum() / w
+        dev = values - mean
+        m2 = _np.dot(dev, dev)
+
+        total = self._n
+        self._n = total - w
+        self._mean -= (mean - self._mean) * w / self._n
+        d = mean - self._mean
+        self._m2 -= m2 + d * d * self._n * w / total
+
+    def scale(self, factor):
+        """
+        Multiplies the weight of the values in the window by factor (e.g. for exponential forgetting)
+        """
+        self._n *= factor
+        self._m2 *= factor
+
+    def get_count(self):
+        return self._n
+
+    def get_mean(self):
+        return self._mean if self._n > 0 else _np.nan
+
+    def get_sum(self):
+        return self._mean * self._n
+
+    def get_var(self):
+        return max(self._m2, 0) / self._n if self._n > 0 else _np.nan
+
+    def get_std(self):
+        return _np.sqrt(self.get_var())
+
+
+def window_moments(values, starts, stops):
+    """
+    Count, mean and variance of many windows [start, stop) of the same array. Sliding windows (starts and stops not
+    decreasing) are updated with RollingStats, adding the values that enter and removing the ones that leave each
+    window in blocks, so that the cost does not depend on the overlap of the windows. The statistics are recomputed
+    from scratch once all the values of a window have been replaced, so the rounding errors do not accumulate.
+
+    Parameters
+    ----------
+    values : numpy.array
+        The values (no NaNs)
+    starts : numpy.array
+        First index of each window
+    stops : numpy.array
+        Index after the last of each window
+
+    Returns
+    -------
+    counts : numpy.array
+        Number of values in each window
+    means : numpy.array
+        Mean of each window (NaN if empty)
+    variances : numpy.array
+        Variance of each window (NaN if empty)
+    """
+    values = _np.asarray(values, dtype=float)
+    starts = _np.clip(starts, 0, len(values))
+    stops = _np.clip(stops, starts, len(values))
+    counts = stops - starts
+    means = _np.empty(len(starts))
+    variances = _np.empty(len(starts))
+
+    # the values are taken relative to the first of the window at each restart, so that the means stay small
+    stats = RollingStats()
+    lo = hi = added = 0
+    ref = 0.
+    for i, (a, b) in enumerate(zip(starts, stops)):
+        if a < lo or b < hi or a >= hi or added >= b - a:
+            ref = values[a] if b > a else 0.
+            stats = RollingStats()
+            stats.add_many(values[a:b] - ref)
+            added = 0
+        else:
+            stats.remove_many(values[lo:a] - ref)
+            stats.add_many(values[hi:b] - ref)
+            added += b - hi
+        lo, hi = a, b
+        means[i] = stats.get_mean() + ref
+        variances[i] = stats.get_var()
+    return counts, means, variances
+
+
+def blocks_stats(blocks):
+    """
+    Count, mean and variance of the values of many blocks (e.g. QuantizedSignal.dequantize_blocks), merged one block at
+    a time so that only one block is in memory
+
+    Parameters
+    ----------
+    blocks : iterable of numpy.array
+        The blocks of values (no NaNs)
+
+    Returns
+    -------
+    stats : RollingStats
+        The statistics of all the values
+    """
+    stats = RollingStats()
+    for block in blocks:
+        stats.add_many(block)
+    return stats
@@ -5,8 +5,9 @@ import numpy as _np
 
 from ..BaseIndicator import Indicator as _Indicator
 from ..filters.Filters import Diff as _Diff
-from ..Signal import EvenlySignal as _EvenlySignal, Signal as _Signal
+from ..Signal import EvenlySignal as _EvenlySignal, Signal as _Signal, QuantizedSignal as _QuantizedSignal
 from ..tools.Tools import Histogram
+from .Rolling import window_moments as _window_moments, blocks_stats as _blocks_stats
 
 
 __author__ = 'AleB'
@@ -21,37 +22,80 @@ class Mean(_Indicator):
 
     @classmethod
     def algorithm(cls, data, params):
+        if data.has_gaps():
+            # the gaps are known: no need to look for NaNs
+            return _np.mean(data.get_valid_values())
         return _np.nanmean(data.get_values())
 
+    @classmethod
+    def algorithm_batch(cls, batch, params):
+        return _np.nanmean(batch.get_values(), axis=1)
+
+    @classmethod
+    def algorithm_rolling(cls, signal, starts, stops, params):
+        return _window_moments(signal.get_values(), starts, stops)[1]
+
+    @classmethod
+    def algorithm_quantized(cls, signal, params):
+        return _blocks_stats(signal.dequantize_blocks()).get_mean()
+
 
 class Min(_Indicator):
     """
     Return minimum of the signal, ignoring any NaNs.
     """
+    _quantized = True
+
     def __init__(self, **kwargs):
         _Indicator.__init__(self, **kwargs)
 
     @classmethod
     def algorithm(cls, data, params):
+        if isinstance(data, _QuantizedSignal):
+            # the gain is positive: the extreme count is the extreme value
+            counts = data.get_counts()[data.get_mask()] if data.has_gaps() else data.get_counts()
+            return data.to_physical(_np.min(counts))
+        if data.has_gaps():
+            # the gaps are known: no need to look for NaNs
+            return _np.min(data.get_valid_values())
         return _np.nanmin(data.get_values())
 
+    @classmethod
+    def algorithm_batch(cls, batch, params):
+        return _np.nanmin(batch.get_values(), axis=1)
+
 
 class Max(_Indicator):
     """
     Return maximum of the signal, ignoring any NaNs.
     """
+    _quantized = True
+
     def __init__(self, **kwargs):
         _Indicator.__init__(self, **kwargs)
 
     @classmethod
     def algorithm(cls, data, params):
+        if isinstance(data, _QuantizedSignal):
+            # the gain is positive: the extreme count is the extreme value
+            counts = data.get_counts()[data.get_mask()] if data.has_gaps() else data.get_counts()
+            return data.to_physical(_np.max(counts))
+        if data.has_gaps():
+            # the gaps are known: no need to look for NaNs
+            return _np.max(data.get_valid_values())
         return _np.nanmax(data.get_values())
 
+    @classmethod
+    def algorithm_batch(cls, batch, params):
+        return _np.nanmax(batch.get_values(), axis=1)
+
 
 class Range(_Indicator):
     """
     Compute the range of the signal, ignoring any NaNs.
     """
+    _quantized = True
+
     def __init__(self, **kwargs):
         _Indicator.__init__(self, **kwargs)
 
@@ -59,6 +103,10 @@ class Range(_Indicator):
     def algorithm(cls, data, params):
         return Max()(data) - Min()(data)
 
+    @classmethod
+    def algorithm_batch(cls, batch, params):
+        return Max()(batch) - Min()(batch)
+
 
 class Median(_Indicator):
     """
@@ -69,7 +117,7 @@ class Median(_Indicator):
 
     @classmethod
     def algorithm(cls, data, params):
-        return _np.median(data.get_values())
+        return _np.median(data.get_valid_values())
 
 
 class StDev(_Indicator):
@@ -81,8 +129,23 @@ class StDev(_Indicator):
 
     @classmethod
     def algorithm(cls, data, params):
+        if data.has_gaps():
+            # the gaps are known: no need to look for NaNs
+            return _np.std(data.get_valid_values())
         return _np.nanstd(data.get_values())
 
+    @classmethod
+    def algorithm_batch(cls, batch, params):
+        return _np.nanstd(batch.get_values(), axis=1)
+
+    @classmethod
+    def algorithm_rolling(cls, signal, starts, stops, params):
+        return _np.sqrt(_window_moments(signal.get_values(), starts, stops)[2])
+
+    @classmethod
+    def algorithm_quantized(cls, signal, params):
+        return _blocks_stats(signal.dequantize_blocks()).get_std()
+
 
 class Sum(_Indicator):
     """
@@ -93,8 +156,24 @@ class Sum(_Indicator):
 
     @classmethod
     def algorithm(cls, data, params):
+        if data.has_gaps():
+            # the gaps are known: no need to look for NaNs
+            return _np.sum(data.get_valid_values())
         return _np.nansum(data.get_values())
 
+    @classmethod
+    def algorithm_batch(cls, batch, params):
+        return _np.nansum(batch.get_values(), axis=1)
+
+    @classmethod
+    def algorithm_rolling(cls, signal, starts, stops, params):
+        counts, means, ignored = _window_moments(signal.get_values(), starts, stops)
+        return _np.where(counts > 0, means * counts, 0)
+
+    @classmethod
+    def algorithm_quantized(cls, signal, params):
+        return _blocks_stats(signal.dequantize_blocks()).get_sum()
+
 
 class AUC(_Indicator):
     """
@@ -110,6 +189,19 @@ class AUC(_Indicator):
         fsamp = signal.get_sampling_freq()
         return (1. / fsamp) * Sum()(signal)
 
+    @classmethod
+    def algorithm_batch(cls, batch, params):
+        return (1. / batch.get_sampling_freq()) * Sum()(batch)
+
+    @classmethod
+    def algorithm_rolling(cls, signal, starts, stops, params):
+        return (1. / signal.get_sampling_freq()) * Sum.algorithm_rolling(signal, starts, stops, {})
+
+    @classmethod
+    def algorithm_quantized(cls, signal, params):
+        # Sum dequantizes a block at a time
+        return cls.algorithm(signal, params)
+
 
 class RMSSD(_Indicator):
     """
@@ -121,7 +213,20 @@ class RMSSD(_Indicator):
     @classmethod
     def algorithm(cls, signal, params):
         diff = _Diff()(signal)
-        return _np.sqrt(_np.mean(_np.power(diff.get_values(), 2)))
+        return _np.sqrt(_np.mean(_np.power(diff.get_valid_values(), 2)))
+
+    @classmethod
+    def algorithm_batch(cls, batch, params):
+        diff = _np.diff(batch.get_values(), axis=1)
+        # NaNs in the block are gaps
+        return _np.sqrt(_np.nanmean(_np.power(diff, 2), axis=1))
+
+    @classmethod
+    def algorithm_rolling(cls, signal, starts, stops, params):
+        # the differences inside [start, stop) are [start, stop - 1)
+        squares = _np.power(_np.diff(signal.get_values()), 2)
+        counts, means, ignored = _window_moments(squares, starts, _np.maximum(stops - 1, starts))
+        return _np.sqrt(means)
 
 
 class SDSD(_Indicator):
@@ -1,7 +1,10 @@
 # coding=utf-8
+import numpy as _np
 from ..Utility import PhUI as _PhUI, abstractmethod as _abstract
 from ..BaseSegmentation import SegmentsGenerator, Segment
-from ..Signal import Signal as _Signal
+from ..Signal import Signal as _Signal, EvenlySignal as _EvenlySignal, UnevenlySignal as _UnevenlySignal, \
+    SegmentsBatch as _SegmentsBatch
+from ..tools.Tools import LabelRuns as _LabelRuns, LabelChanges as _LabelChanges
 
 __author__ = 'AleB'
 
@@ -9,9 +12,12 @@ __author__ = 'AleB'
 class _SegmentsWithLabelSignal(SegmentsGenerator):
     # Assumed: label signal extended over the end by holding the value
 
-    def __init__(self, drop_cut=True, drop_mixed=True, **kwargs):
-        super(_SegmentsWithLabelSignal, self).__init__(drop_cut=drop_cut, drop_mixed=drop_mixed, **kwargs)
+    def __init__(self, drop_cut=True, drop_mixed=True, drop_gaps=False, **kwargs):
+        super(_SegmentsWithLabelSignal, self).__init__(drop_cut=drop_cut, drop_mixed=drop_mixed, drop_gaps=drop_gaps,
+                                                       **kwargs)
         self._labsig = None
+        self._changes = None
+        self._runs = None
 
     @_abstract
     def init_segmentation(self):
@@ -61,18 +67,115 @@ class _SegmentsWithLabelSignal(SegmentsGenerator):
         # Don't drop, inclusive begin time, exclusive end time
         return False, b, e
 
+    def next_checked_times(self):
+        """
+        Next segment bounds, dropped or cut to the signal range (see check_drop_and_range)
+        @raise StopIteration: End of the iteration
+        """
+        while True:
+            b, e = self.next_times()
+
+            drop, b, e = self.check_drop_and_range(self._signal, b, e)
+
+            if not drop:
+                return b, e
+
+    def check_drop_and_range_many(self, s, b, e):
+        """
+        Vectorized check_drop_and_range
+        @return: keep, b, e: Whether to keep each segment and the bounds cut to the signal range
+        """
+        s_start = s.get_start_time()
+        s_end = s.get_end_time()
+
+        # full under-range or full over-range
+        keep = (e >= s_start) & (b < s_end)
+
+        # part before start
+        before = b < s_start
+        if self._params['drop_mixed'] or self._params['drop_cut']:
+            keep &= ~before
+        else:
+            b = _np.where(before, s_start, b)
+
+        # part after end
+        after = e > s_end
+        if self._params['drop_cut']:
+            keep &= ~after
+        else:
+            e = _np.where(after, s_end, e)
+
+        return keep, b, e
+
+    def compute_labels(self, b, e):
+        """
+        Labels of many segments at once, with the checks of next_segment_mix_labels (gaps, label range, mixed labels)
+        as bulk queries on the sorted runs of the gaps and on the IntervalIndex of the label runs (O(log n) per
+        segment).
+        The bounds should be already checked against the signal range (see check_drop_and_range_many).
+
+        Returns
+        -------
+        keep : numpy.array
+            Whether each segment is kept
+        labels : numpy.array
+            The label of each segment (None if mixed or without a label signal)
+        """
+        keep = _np.ones(len(b), dtype=bool)
+        labels = _np.empty(len(b), dtype=object)
+
+        if self._params['drop_gaps']:
+            keep &= self._signal.is_valid_many(self._signal.get_iidx_many(b), self._signal.get_iidx_many(e))
+
+        if not isinstance(self._labsig, _Signal) or len(b) == 0:
+            return keep, labels
+
+        in_range, lb, le = self.check_drop_and_range_many(self._labsig, b, e)
+        keep &= in_range
+
+        # labels segment bounds, as get_iidx
+        if isinstance(self._labsig, _UnevenlySignal):
+            fs = self._labsig.get_sampling_freq()
+            t0 = self._labsig.get_start_time()
+            first = _np.searchsorted(self._labsig.get_indices(), (lb - t0) * fs)
+            last = _np.searchsorted(self._labsig.get_indices(), (le - t0) * fs)
+        else:
+            first = self._labsig.get_iidx_many(lb)
+            last = self._labsig.get_iidx_many(le)
+
+        if self._runs is None:
+            # index of the runs of equal labels (cached on the label signal), by inner index
+            starts, stops, values = _LabelRuns()(self._labsig)
+            self._runs = IntervalIndex(starts, stops), values
+        index, values = self._runs
+        n = len(self._labsig)
+        first = _np.clip(first, 0, n - 1)
+        stop = _np.maximum(_np.minimum(last, n), first + 1)
+
+        # the runs do not overlap: a segment is mixed if it overlaps more than one run, or if it starts before the
+        # label signal (as check_drop_and_range)
+        mixed = (index.count_overlapping(first, stop) > 1) | (b < self._labsig.get_start_time())
+        found, ignored = index.overlapping_flat(first[~mixed], stop[~mixed])
+        labels[~mixed] = list(values[found])
+        if self._params['drop_mixed']:
+            keep &= ~mixed
+        return keep, labels
+
     def next_segment_mix_labels(self):
         label = b = e = None
         while True:
             # break    ==> keep
             # continue ==> drop
 
-            b, e = self.next_times()
-
-            drop, b, e = self.check_drop_and_range(self._signal, b, e)
+            b, e = self.next_checked_times()
 
-            if drop:
-                continue
+            if self._params['drop_gaps']:
+                # None: before the first sample of an UnevenlySignal
+                first, last = self._signal.get_iidx(b), self._signal.get_iidx(e)
+                last = 0 if last is None else min(last, len(self._signal))
+                if not self._signal.is_valid(first, last):
+                    # some samples are missing
+                    continue
 
             if not isinstance(self._labsig, _Signal):
                 label = None
@@ -93,17 +196,19 @@ class _SegmentsWithLabelSignal(SegmentsGenerator):
                 label = self._labsig[first]
 
                 # Check if classically mixed
-                # compare with first each label in [b+1, e)
-                for i in range(last - 1, first, -1):
-                    if label != self._labsig[i]:
-                        # this is a mixed segment
-                        if self._params['drop_mixed']:
-                            # goto next segment
-                            continue
-                        else:
-                            # keep with label == None
-                            label = None
-                        break  # for
+                # same number of label changes at the first and at the last label in [b, e)
+                if self._changes is None:
+                    # cached on the label signal
+                    self._changes = _LabelChanges()(self._labsig)
+                last = min(last, len(self._changes)) - 1
+                if last > first and self._changes[last] != self._changes[first]:
+                    # this is a mixed segment
+                    if self._params['drop_mixed']:
+                        # goto next segment
+                        continue
+                    else:
+                        # keep with label == None
+                        label = None
             # keep
             break
 
@@ -135,6 +240,8 @@ class FixedSegments(_SegmentsWithLabelSignal):
          segments is set to None.
     drop_cut : bool, default=True
         Weather to drop segments that are shorter due to the crossing of the signal end.
+    drop_gaps : bool, default=False
+        Weather to drop segments that overlap a gap (missing samples) of the signal.
     """
 
     def __init__(self, step, width=None, start=None, labels=None, drop_mixed=True, drop_cut=True, **kwargs):
@@ -147,24 +254,92 @@ class FixedSegments(_SegmentsWithLabelSignal):
             "The parameter 'labels' should be a Signal."
         self._step = None
         self._width = None
-        self._t = None
+        self._b = None
+        self._e = None
+        self._i = None
 
     def init_segmentation(self):
         self._step = self._params["step"]
         w = self._params["width"]
         self._width = w if w is not None else self._step
         self._labsig = self._params["labels"]
-        self._t = self._params["start"]
+        self._b = self._e = None
+        self._i = 0
 
-    def next_times(self):
-        if self._t is None:
-            self._t = self._signal.get_start_time()
-        b = self._t
-        self._t += self._step
-        e = b + self._width
-        if b >= self._signal.get_end_time():
+    def compute_bounds(self):
+        """
+        Computes at once the bounds of all the segments, dropped or cut to the signal range as the iteration does
+        (labels and gaps are not considered here).
+
+        Returns
+        -------
+        begins : numpy.array
+            Begin times of the segments
+        ends : numpy.array
+            End times of the segments
+        """
+        signal = self._signal
+        step = self._params["step"]
+        width = self._params["width"] if self._params["width"] is not None else step
+        t0 = self._params["start"] if self._params["start"] is not None else signal.get_start_time()
+        s_end = signal.get_end_time()
+
+        n = max(int(_np.ceil((s_end - t0) / step)), 0) + 1
+        b = t0 + _np.arange(n) * step
+        b = b[b < s_end]
+
+        keep, b, e = self.check_drop_and_range_many(signal, b, b + width)
+        return b[keep], e[keep]
+
+    def get_batch(self):
+        """
+        All the segments at once, as a SegmentsBatch (labels are not considered). The samples of each segment are
+        the ones of the iterated segments. When all the segments have the same length and the step is a whole number
+        of samples the batch is a strided view on the signal (no copy), otherwise the values are gathered and the
+        shorter segments padded with NaN. Samples in the gaps of the signal are set to NaN.
+
+        Returns
+        -------
+        batch : SegmentsBatch
+            The segments, one per row
+        """
+        signal = self._signal
+        assert isinstance(signal, _EvenlySignal), "Batches need an EvenlySignal"
+        assert self._params['drop_cut'], "Batches need segments of the same length (drop_cut=True)"
+
+        fsamp = signal.get_sampling_freq()
+        step = self._params["step"] * fsamp
+
+        b, e = self.compute_bounds()
+        # same indices as the segments
+        views = signal.segment_many(b, e)
+        starts, lengths = views.get_starts(), views.get_lengths()
+
+        values = signal.get_values()
+        strided = len(starts) > 0 and step == int(step) and _np.all(lengths == lengths[0]) and \
+            _np.all(starts == starts[0] + _np.arange(len(starts)) * int(step))
+
+        if strided and not signal.has_gaps():
+            block = _np.lib.stride_tricks.as_strided(values[starts[0]:], shape=(len(starts), lengths[0]),
+                                                     strides=(int(step) * values.strides[0], values.strides[0]),
+                                                     writeable=False)
+        else:
+            block = views.to_array()
+
+        return _SegmentsBatch(block, fsamp, b, e, signal.get_signal_nature())
+
+    def next_checked_times(self):
+        if self._b is None:
+            self._b, self._e = self.compute_bounds()
+        if self._i >= len(self._b):
             raise StopIteration()
-        return b, e
+        i = self._i
+        self._i += 1
+        return self._b[i], self._e[i]
+
+    def next_times(self):
+        # already in range
+        return self.next_checked_times()
 
 
 class CustomSegments(_SegmentsWithLabelSignal):
@@ -187,6 +362,11 @@ class CustomSegments(_SegmentsWithLabelSignal):
          segments is set to None.
     drop_cut : bool, default=True
         Weather to drop segments that are shorter due to the crossing of the signal end.
+    drop_gaps : bool, default=False
+        Weather to drop segments that overlap a gap (missing samples) of the signal.
+
+    The segments are checked and labelled all at once (see compute_segments), get_overlapping finds the segments
+    overlapping an interval.
     """
 
     def __init__(self, begins, ends, labels=None, drop_mixed=True, drop_cut=True, **kwargs):
@@ -198,18 +378,142 @@ class CustomSegments(_SegmentsWithLabelSignal):
         self._i = None
         self._b = None
         self._e = None
+        self._labels = None
+        self._index = None
 
     def init_segmentation(self):
-        self._i = -1
-        self._b = self._params['begins']
-        self._e = self._params['ends']
+        self._i = 0
+        self._labsig = self._params['labels']
+        self._b = self._e = self._labels = None
+
+    def compute_segments(self):
+        """
+        Computes at once the bounds and the labels of all the segments, as the iteration returns them.
+
+        Returns
+        -------
+        begins : numpy.array
+            Begin times of the segments
+        ends : numpy.array
+            End times of the segments
+        labels : numpy.array
+            Labels of the segments
+        """
+        b = _np.asarray(self._params['begins'], dtype=float)
+        e = _np.asarray(self._params['ends'], dtype=float)
+        keep, b, e = self.check_drop_and_range_many(self._signal, b, e)
+        keep_labels, labels = self.compute_labels(b, e)
+        keep &= keep_labels
+        return b[keep], e[keep], labels[keep]
+
+    def get_index(self):
+        """
+        The IntervalIndex of the segments (begins and ends as given, in their order)
+        """
+        if self._index is None:
+            self._index = IntervalIndex(self._params['begins'], self._params['ends'])
+        return self._index
+
+    def get_overlapping(self, t_start, t_stop):
+        """
+        Positions (in begins/ends) of the segments overlapping the interval [t_start, t_stop)
+        """
+        return self.get_index().overlapping(t_start, t_stop)
 
-    def next_times(self):
-        self._i += 1
-        if self._i < len(self._b):
-            return self._b[self._i], self._e[self._i]
-        else:
+    def next_segment_mix_labels(self):
+        if self._b is None:
+            self._b, self._e, self._labels = self.compute_segments()
+        if self._i >= len(self._b):
             raise StopIteration()
+        i = self._i
+        self._i += 1
+        return self._b[i], self._e[i], self._labels[i]
+
+    def next_times(self):
+        b, e, ignored = self.next_segment_mix_labels()
+        return b, e
+
+
+class IntervalIndex(object):
+    """
+    Sorted index of intervals [begin, end) for overlap queries. The intervals are sorted by begin and the running
+    maximum of the ends is kept, so that a query costs O(log n + k), with k the number of intervals that begin
+    before the end of the query and whose running maximum end is after its start (the result for not nested
+    intervals).
+
+    Parameters
+    ----------
+    begins : array
+        Begin times of the intervals
+    ends : array
+        End times of the intervals, same length of begins
+    """
+
+    def __init__(self, begins, ends):
+        begins = _np.asarray(begins, dtype=float)
+        ends = _np.asarray(ends, dtype=float)
+        assert len(begins) == len(ends), "The number of begins has to be equal to the number of ends"
+        self._order = _np.argsort(begins, kind='mergesort')
+        self._begins = begins[self._order]
+        self._ends = ends[self._order]
+        self._max_ends = _np.maximum.accumulate(self._ends) if len(ends) > 0 else self._ends
+        self._sorted_ends = _np.sort(ends)
+
+    def __len__(self):
+        return len(self._order)
+
+    def _candidates(self, t_start, t_stop):
+        # sorted positions [q, p): begin < t_stop and running max end > t_start
+        p = _np.searchsorted(self._begins, t_stop, side='left')
+        q = _np.searchsorted(self._max_ends, t_start, side='right')
+        return q, p
+
+    def overlapping(self, t_start, t_stop):
+        """
+        Positions (in the original order) of the intervals overlapping [t_start, t_stop), sorted by begin
+        """
+        q, p = self._candidates(t_start, t_stop)
+        if p <= q:
+            return _np.zeros(0, dtype=int)
+        found = _np.arange(q, p)[self._ends[q:p] > t_start]
+        return self._order[found]
+
+    def overlapping_flat(self, t_starts, t_stops):
+        """
+        overlapping for many query intervals at once, with vectorized searches and filtering of the candidates
+        @return: found, counts: The positions of the intervals overlapping each query, concatenated (each group
+         sorted by begin), and their number for each query
+        """
+        t_starts = _np.asarray(t_starts, dtype=float)
+        t_stops = _np.asarray(t_stops, dtype=float)
+        qs, ps = self._candidates(t_starts, t_stops)
+        lengths = _np.maximum(ps - qs, 0)
+
+        # the sorted positions [q, p) of all the queries, one after the other
+        query = _np.repeat(_np.arange(len(qs)), lengths)
+        positions = _np.arange(len(query)) + _np.repeat(qs - (_np.cumsum(lengths) - lengths), lengths)
+        hit = self._ends[positions] > t_starts[query]
+        return self._order[positions[hit]], _np.bincount(query[hit], minlength=len(qs))
+
+    def overlapping_many(self, t_starts, t_stops):
+        """
+        overlapping for many query intervals at once (see overlapping_flat)
+        @return: A list with the positions of the intervals overlapping each query
+        """
+        found, counts = self.overlapping_flat(t_starts, t_stops)
+        if len(counts) == 0:
+            return []
+        return _np.split(found, _np.cumsum(counts)[:-1])
+
+    def count_overlapping(self, t_starts, t_stops):
+        """
+        Number of intervals overlapping each of the query intervals, computed with two binary searches per query
+        as: (number beginning before the stop) - (number ending before or at the start)
+        """
+        t_starts = _np.asarray(t_starts, dtype=float)
+        t_stops = _np.asarray(t_stops, dtype=float)
+        return _np.searchsorted(self._begins, t_stops, side='left') - \
+            _np.searchsorted(self._sorted_ends, t_starts, side='right')
 
 
 class LabelSegments(_SegmentsWithLabelSignal):
@@ -228,6 +532,8 @@ class LabelSegments(_SegmentsWithLabelSignal):
          segments is set to None.
     drop_cut : bool, default=True
         Weather to drop segments that are shorter due to the crossing of the signal end.
+    drop_gaps : bool, default=False
+        Weather to drop segments that overlap a gap (missing samples) of the signal.
     """
 
     def __init__(self, labels, drop_mixed=True, drop_cut=True, **kwargs):
@@ -236,18 +542,19 @@ class LabelSegments(_SegmentsWithLabelSignal):
             "The parameter 'labels' should be an Signal."
         self._i = None
         self._labsig = None
+        self._starts = None
+        self._stops = None
 
     def init_segmentation(self):
         self._i = 0
         self._labsig = self._params['labels']
+        # cached on the label signal
+        self._starts, self._stops, ignored = _LabelRuns()(self._labsig)
 
     def next_times(self):
-        if self._i >= len(self._labsig):
+        if self._i >= len(self._starts):
             raise StopIteration()
-        end = self._i
-        while end < len(self._labsig) and self._labsig[self._i] == self._labsig[end]:
-            end += 1
-        b = self._labsig.get_time_from_iidx(self._i)
-        e = self._labsig.get_time_from_iidx(end)
-        self._i = end
+        b = self._labsig.get_time_from_iidx(self._starts[self._i])
+        e = self._labsig.get_time_from_iidx(self._stops[self._i])
+        self._i += 1
         return b, e
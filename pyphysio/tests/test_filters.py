@@ -8,6 +8,196 @@ __author__ = 'aleb'
 
 
 class FiltersTest(unittest.TestCase):
+    def test_iir_design(self):
+        ecg = ph.EvenlySignal(TestData.ecg(), sampling_freq=2048)
+
+        sos = ph.IIRFilter.design(2048, 70, 45, .1, 40, 'butter')
+        self.assertIs(ph.IIRFilter.design(2048., [70], [45], .1, 40, 'butter'), sos)
+        self.assertIsNot(ph.IIRFilter.design(1024, 70, 45, .1, 40, 'butter'), sos)
+
+        # high order (narrow transition band): stable as second-order sections
+        filtered = ph.IIRFilter(fp=45, fs=46, att=80)(ecg)
+        self.assertFalse(np.any(np.isnan(filtered)))
+        self.assertLess(np.max(np.abs(filtered)), np.max(np.abs(ecg)) * 2)
+
+    def test_convolution_methods(self):
+        values = np.cumsum(np.random.rand(20000) - .5)
+        s = ph.EvenlySignal(values, sampling_freq=1000)
+        # short (direct), long (overlap-add) and as long as the signal (fft)
+        for irf in [np.random.rand(9), np.random.rand(3000), np.random.rand(15000)]:
+            out = ph.ConvolutionalFilter(irftype='custom', irf=irf)(s)
+            # same as padding with the first and last values
+            n = len(irf)
+            padded = np.r_[np.ones(n) * values[0], values, np.ones(n) * values[-1]]
+            expected = np.convolve(padded, irf / np.sum(irf), mode='same')[n:-n]
+            self.assertEqual(len(out), len(s))
+            np.testing.assert_allclose(out, expected, atol=1e-9)
+
+    def test_deconvolution_fft(self):
+        irf = ph.DriverEstim._gen_bateman(8, [.75, 2])
+        driver = np.r_[np.zeros(100), np.random.rand(10007), np.zeros(len(irf))]
+        s = ph.EvenlySignal(np.convolve(driver, irf / np.sum(irf))[:len(driver)], sampling_freq=8)
+
+        out = ph.DeConvolutionalFilter(irf=irf, deconv_method='fft')(s)
+        self.assertEqual(len(out), len(s))
+        np.testing.assert_allclose(out, driver, atol=1e-6)
+
+        n = len(s) + 3
+        spectrum = ph.DeConvolutionalFilter.irf_spectrum(irf, n)
+        self.assertIs(ph.DeConvolutionalFilter.irf_spectrum(irf.copy(), n), spectrum)
+
+    def test_iir_multirate(self):
+        bvp = ph.EvenlySignal(TestData.bvp(), sampling_freq=2048, start_time=1)
+        self.assertEqual(ph.IIRFilter.get_decimation_factor(2048, 2.4, 6), 64)
+
+        full = ph.IIRFilter(fp=2.4, fs=6, ftype='ellip')(bvp)
+        multirate = ph.IIRFilter(fp=2.4, fs=6, ftype='ellip', multirate=True)(bvp)
+        self.assertEqual(len(multirate), len(bvp))
+        self.assertEqual(multirate.get_start_time(), 1)
+        self.assertLess(np.max(np.abs(multirate - full)), 0.05 * np.ptp(full))
+
+        low = ph.IIRFilter(fp=2.4, fs=6, ftype='ellip', multirate=True, interpolate=False)(bvp)
+        self.assertEqual(low.get_sampling_freq(), 32)
+        self.assertEqual(len(low), int(np.ceil(len(bvp) / 64)))
+
+        # no upper stop band: at the full rate
+        high = ph.IIRFilter(fp=45, fs=40, multirate=True)(bvp)
+        np.testing.assert_array_equal(high, ph.IIRFilter(fp=45, fs=40)(bvp))
+
+    def test_normalize_streaming(self):
+        ecg = ph.EvenlySignal(TestData.ecg()[:20000] + 1e4, sampling_freq=2048)
+        blocks = [ecg.segment_iidx(i, i + 999) for i in range(0, len(ecg), 999)]
+
+        for method in ['mean', 'standard', 'min', 'maxmin', 'custom']:
+            stream = ph.Normalize(norm_method=method, norm_bias=3, norm_range=2).streaming()
+            for b in blocks:
+                stream.update(b)
+            np.testing.assert_allclose(stream.normalize(ecg),
+                                       ph.Normalize(norm_method=method, norm_bias=3, norm_range=2)(ecg), atol=1e-9)
+
+        # window: statistics of the last samples only
+        stream = ph.StreamingNormalize(window=3000)
+        out = [stream.process(b) for b in blocks]
+        last = ecg.get_values()[-3000:]
+        np.testing.assert_allclose(out[-1], (blocks[-1] - np.mean(last)) / np.std(last))
+
+        # forgetting: same as the exponentially weighted statistics
+        stream = ph.StreamingNormalize(norm_method='mean', forgetting=.001)
+        for b in blocks:
+            stream.update(b)
+        weights = .999 ** np.arange(len(ecg) - 1, -1, -1)
+        self.assertAlmostEqual(stream.get_bias(), np.sum(weights * ecg) / np.sum(weights))
+
+    def test_denoise_eda_chunks(self):
+        values = TestData.eda()[::16][:5000].copy()
+        values[1000:1040] += np.random.randn(40) * .5
+        values[:5] += 1
+        values[-3:] += 2
+        eda = ph.EvenlySignal(values, sampling_freq=8, start_time=2)
+
+        # reference: interpolation over the samples where the smoothed derivative is below the threshold
+        noise = ph.ConvolutionalFilter(irftype='triang', win_len=2, normalize=True)(np.abs(np.diff(eda)))
+        idx_ok = np.r_[0, np.where(noise <= .01)[0], len(eda) - 1]
+        expected = np.interp(np.arange(len(eda)), idx_ok, values[idx_ok])
+
+        default = ph.DenoiseEDA._chunk_size
+        try:
+            for chunk_size in [7, 100, default]:
+                ph.DenoiseEDA._chunk_size = chunk_size
+                out = ph.DenoiseEDA(threshold=.01).algorithm(eda, {'threshold': .01, 'win_len': 2})
+                np.testing.assert_allclose(out, expected, atol=1e-12)
+                self.assertEqual(out.get_start_time(), 2)
+        finally:
+            ph.DenoiseEDA._chunk_size = default
+
+    def test_median_hampel(self):
+        from scipy.ndimage import median_filter
+        values = TestData.ecg()[:3000].copy()
+        values[::200] += 5
+        ecg = ph.EvenlySignal(values, sampling_freq=100, start_time=1)
+
+        med = ph.RunningMedian(win_len=.1)(ecg)
+        np.testing.assert_allclose(med, median_filter(values, 11, mode='nearest'))
+        self.assertEqual(med.get_start_time(), 1)
+
+        # reference: median and MAD of each window, edges held
+        half = 5
+        padded = np.r_[[values[0]] * half, values, [values[-1]] * half]
+        expected = values.copy()
+        for i in range(len(values)):
+            w = padded[i:i + 2 * half + 1]
+            m = np.median(w)
+            if abs(values[i] - m) > 3 * 1.4826 * np.median(np.abs(w - m)):
+                expected[i] = m
+        out = ph.Hampel(win_len=.1)(ecg)
+        np.testing.assert_allclose(out, expected)
+        self.assertTrue(np.all(out[::200] < 5))
+
+        # more channels
+        channels = np.c_[values, -values]
+        np.testing.assert_allclose(ph.Hampel.hampel(channels, half)[:, 1], -expected)
+        np.testing.assert_allclose(ph.RunningMedian.running_median(channels, half)[:, 0], med)
+
+    def test_running_median_large_windows(self):
+        from scipy.ndimage import median_filter
+        values = np.random.RandomState(0).normal(size=20000)
+        values[::7] = np.round(values[::7])  # ties
+
+        for half in [0, 1, 37, 4000]:
+            np.testing.assert_array_equal(ph.RunningMedian.running_median(values, half),
+                                          median_filter(values, 2 * half + 1, mode='nearest'))
+
+    def test_chunked(self):
+        ecg = ph.EvenlySignal(TestData.ecg()[:20000], sampling_freq=2048, start_time=3)
+        filters = [ph.IIRFilter(fp=1, fs=.3), ph.IIRFilter(fp=[5, 25], fs=[0.05, 50], ftype='ellip'),
+                   ph.ConvolutionalFilter(irftype='gauss', win_len=.1), ph.Diff(degree=3), ph.Hampel(win_len=.01),
+                   ph.Normalize()]
+        for f in filters:
+            whole = f(ecg)
+            for chunk_size in [1000, 7000]:
+                out = f.chunked(ecg, chunk_size)
+                self.assertEqual(len(out), len(whole))
+                self.assertEqual(out.get_start_time(), whole.get_start_time())
+                np.testing.assert_allclose(out, whole, rtol=0, atol=np.ptp(whole) * 1e-9)
+
+        # multirate: the chunks keep the decimation phase, the edges depend on the whole signal
+        f = ph.IIRFilter(fp=20, fs=40, multirate=True)
+        inner = slice(2048, -2048)
+        np.testing.assert_allclose(f.chunked(ecg, 3000)[inner], f(ecg)[inner], rtol=0, atol=1e-9)
+
+        # gaps kept, result written in the given array
+        f = ph.IIRFilter(fp=45, fs=70)
+        ecg.set_gaps([[5000, 6000]])
+        values = np.zeros(len(ecg))
+        out = f.chunked(ecg, 3000, out=values)
+        np.testing.assert_allclose(values, f(ecg), rtol=0, atol=1e-12)
+        np.testing.assert_array_equal(out.get_gaps(), [[5000, 6000]])
+
+    def test_iir_streaming(self):
+        fsamp = 256
+        ecg = ph.EvenlySignal(TestData.ecg()[:20000], sampling_freq=fsamp, start_time=3)
+        iir = ph.IIRFilter(fp=1, fs=.3)
+        blocks = [ecg.segment_iidx(i, i + 1000) for i in range(0, len(ecg), 1000)]
+
+        # causal: same as filtering the whole recording forward
+        stream = iir.streaming(fsamp)
+        causal = np.concatenate([stream.process(b) for b in blocks])
+        sos = ph.IIRFilter.design(fsamp, 1, .3, .1, 40, 'butter')
+        from scipy.signal import sosfilt, sosfilt_zi
+        np.testing.assert_allclose(causal, sosfilt(sos, ecg.get_values(), zi=sosfilt_zi(sos) * ecg[0])[0])
+
+        # look ahead: close to the zero phase filter, delayed
+        stream = iir.streaming(fsamp, look_ahead=4)
+        self.assertEqual(stream.get_latency(), 4 * fsamp)
+        out = [stream.process(b) for b in blocks]
+        self.assertEqual(len(out[0]), 0)
+        self.assertEqual(out[2].get_start_time(), 3 + (2000 - 4 * fsamp) / fsamp)
+        out = np.concatenate(out + [stream.flush()])
+        self.assertEqual(len(out), len(ecg))
+        zero_phase = iir(ecg)
+        inner = slice(4 * fsamp, -4 * fsamp)
+        self.assertLess(np.max(np.abs(out[inner] - zero_phase[inner])), np.ptp(ecg) * 0.01)
+
     def test_general(self):
         # %%
         FSAMP = 2048
@@ -37,8 +227,8 @@ class FiltersTest(unittest.TestCase):
 
         # %% TEST IIRFilter
         self.assertAlmostEqual(int(np.max(ph.IIRFilter(fp=10, fs=70)(ecg)) * 10000), 8238)
-        self.assertAlmostEqual(int(np.max(ph.IIRFilter(fp=70, fs=45)(ecg)) * 10000), 2144)
-        self.assertAlmostEqual(int(np.max(ph.IIRFilter(fp=[5, 25], fs=[0.05, 50], ftype='ellip')(ecg)) * 10000), 8786)
+        self.assertAlmostEqual(int(np.max(ph.IIRFilter(fp=70, fs=45)(ecg)) * 10000), 2169)
+        self.assertAlmostEqual(int(np.max(ph.IIRFilter(fp=[5, 25], fs=[0.05, 50], ftype='ellip')(ecg)) * 10000), 8784)
 
         # %%
 
@@ -68,6 +68,181 @@ class GeneralTest(unittest.TestCase):
         self.assertEqual(results.shape, (len(segments), len(features) + 3))
         self.assertEqual(len(columns), len(features) + 3)
 
+    def test_fmap_parallel(self):
+        s = ph.EvenlySignal(values=np.cumsum(np.random.rand(3000) - .5) * 100, sampling_freq=10)
+        labels = ph.EvenlySignal(values=np.repeat([0, 1, 2], 1000), sampling_freq=10)
+        algos = [ph.Mean(), ph.StDev(), ph.RMSSD(), ph.PNNx(threshold=25)]
+
+        segmenter = ph.FixedSegments(step=2, width=5, labels=labels)
+        serial, columns = ph.fmap(segmenter(s), algos)
+        parallel, columns_p = ph.fmap(segmenter(s), algos, n_jobs=3)
+        parallel_chunks, ignored = ph.fmap([x for x in segmenter(s)], algos, n_jobs=2, chunk_size=7)
+
+        self.assertEqual(list(columns), list(columns_p))
+        self.assertEqual(serial.shape, parallel.shape)
+        np.testing.assert_array_equal(serial, parallel)
+        np.testing.assert_array_equal(parallel, parallel_chunks)
+
+    def test_fmap_parallel_spawn(self):
+        import multiprocessing as mp
+
+        s = ph.UnevenlySignal(values=np.cumsum(np.random.rand(1000) - .5) * 100,
+                              x_values=np.arange(1000) * 3 + np.random.randint(0, 3, 1000), sampling_freq=10,
+                              x_type='indices', start_time=2)
+        s.set_gaps([[100, 150]])
+        algos = [ph.Mean(), ph.StDev(), ph.Max()]
+        segments = [x for x in ph.FixedSegments(step=20, width=50)(s)]
+        serial, columns = ph.fmap(segments, algos)
+
+        # the metadata of the signal is not pickled with it
+        method = mp.get_start_method()
+        mp.set_start_method('spawn', force=True)
+        try:
+            parallel, columns_p = ph.fmap(segments, algos, n_jobs=2)
+        finally:
+            mp.set_start_method(method, force=True)
+        np.testing.assert_array_equal(serial, parallel)
+
+    def test_fmap_stream(self):
+        from tempfile import mkdtemp
+        from shutil import rmtree
+        import os
+
+        s = ph.EvenlySignal(values=np.cumsum(np.random.rand(3000) - .5) * 100, sampling_freq=10)
+        labels = ph.EvenlySignal(values=np.repeat(['a', 'b', 'c'], 1000), sampling_freq=10)
+        algos = [ph.Mean(), ph.StDev()]
+        segmenter = ph.FixedSegments(step=2, width=5, labels=labels, drop_mixed=False)
+
+        values, columns = ph.fmap(segmenter(s), algos)
+
+        rows = np.asarray([x for x in ph.ifmap(segmenter(s), algos)])
+        np.testing.assert_array_equal(rows, values)
+
+        streamed = []
+        self.assertEqual(ph.fmap_stream(segmenter(s), algos, ph.CallbackSink(streamed.append)), len(values))
+        np.testing.assert_array_equal(np.asarray(streamed), rows)
+
+        path = mkdtemp()
+        try:
+            ph.fmap_stream(segmenter(s), algos, ph.CSVSink(os.path.join(path, 'out.csv')))
+            csv = np.genfromtxt(os.path.join(path, 'out.csv'), delimiter=',', names=True, dtype=None,
+                                encoding='utf-8')
+            self.assertEqual(len(csv), len(values))
+            np.testing.assert_allclose(csv[csv.dtype.names[3]], values[:, 3].astype(float))
+
+            ph.fmap_stream(segmenter(s), algos, ph.ColumnarSink(os.path.join(path, 'out'), block_size=7))
+            cols = ph.ColumnarSink.load(os.path.join(path, 'out'))
+            np.testing.assert_allclose(cols['begin'], values[:, 0].astype(float))
+            np.testing.assert_allclose(cols[columns[4]], values[:, 4].astype(float))
+            self.assertEqual(list(cols['label']), ['' if x is None else x for x in values[:, 2]])
+        finally:
+            rmtree(path)
+
+    def test_fmap_table(self):
+        s = ph.EvenlySignal(values=np.cumsum(np.random.rand(3000) - .5) * 100, sampling_freq=10)
+        labels = ph.EvenlySignal(values=np.repeat(['a', 'b', 'c'], 1000), sampling_freq=10)
+        algos = [ph.Mean(name='mu'), ph.StDev(name='std'), ph.algo(lambda d, p: None)(name='none')]
+        segmenter = ph.FixedSegments(step=2, width=5, labels=labels, drop_mixed=False)
+
+        values, columns = ph.fmap(segmenter(s), algos)
+        table = ph.fmap(segmenter(s), algos, as_table=True)
+
+        self.assertEqual(len(table), len(values))
+        self.assertEqual(table.get_names(), ['mu', 'std', 'none'])
+        self.assertEqual(table['mu'].dtype, np.float64)
+        np.testing.assert_allclose(table.get_begins(), values[:, 0].astype(float))
+        np.testing.assert_allclose(table.get_column('std'), values[:, 4].astype(float))
+        self.assertEqual(list(table.get_labels()), list(values[:, 2]))
+        self.assertTrue(np.all(table.get_nan_mask()[:, 2]))
+        self.assertFalse(np.any(table.get_nan_mask()[:, :2]))
+
+        # the columns are views on a single structured array, converted without copies
+        self.assertIs(table['mu'], table.get_column('mu'))
+        structured = table.to_structured()
+        self.assertEqual(structured.dtype.names, ('begin', 'end', 'label', 'mu', 'std', 'none'))
+        self.assertTrue(np.shares_memory(structured, table['mu']))
+        self.assertTrue(np.shares_memory(table.to_records(), structured))
+        np.testing.assert_array_equal(table.to_records().mu, table['mu'])
+
+        # from a generator, more rows than the initial capacity
+        table = ph.FeatureTable.from_rows(ph.ifmap(segmenter(s), algos), columns)
+        self.assertEqual(len(table), len(values))
+        np.testing.assert_array_equal(table['mu'], values[:, 3].astype(float))
+
+    def test_fmap_prefetch(self):
+        from tempfile import mkdtemp
+        from shutil import rmtree
+        import os
+
+        path = mkdtemp()
+        try:
+            data = np.memmap(os.path.join(path, 'data.bin'), dtype=float, mode='w+', shape=(3000,))
+            data[:] = np.cumsum(np.random.rand(3000) - .5) * 100
+            s = ph.EvenlySignal(values=data, sampling_freq=10)
+            algos = [ph.Mean(), ph.StDev(), ph.PNNx(threshold=25)]
+            segmenter = ph.FixedSegments(step=2, width=5)
+
+            values = np.asarray(list(ph.ifmap(segmenter(s), algos)))
+            prefetched, ignored = ph.fmap(segmenter(s), algos, read_ahead=3)
+            np.testing.assert_array_equal(values, prefetched)
+
+            portions = ph.PrefetchIterator(segmenter(s), read_ahead=2)
+            seg, portion = next(portions)
+            self.assertFalse(np.shares_memory(portion, data))
+            np.testing.assert_array_equal(portion, seg(s))
+            portions.close()
+            self.assertRaises(StopIteration, next, portions)
+
+            def fail(seg, signal):
+                raise ValueError("not readable")
+            self.assertRaises(ValueError, list, ph.PrefetchIterator(segmenter(s), load=fail))
+
+            # abandoned before the end: the loading thread stops
+            with ph.PrefetchIterator(segmenter(s), read_ahead=2) as portions:
+                next(portions)
+            self.assertFalse(portions.is_alive())
+
+            import gc
+            import threading
+            portions = ph.PrefetchIterator(segmenter(s), read_ahead=2)
+            next(portions)
+            thread = portions._thread
+            del portions
+            gc.collect()
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+            self.assertNotIn(thread, threading.enumerate())
+            del data, s
+        finally:
+            rmtree(path)
+
+    def test_fmap_rolling(self):
+        s = ph.EvenlySignal(values=np.cumsum(np.random.rand(3000) - .5) * 100 + 1e6, sampling_freq=10)
+        algos = [ph.Mean(), ph.StDev(), ph.Sum(), ph.AUC(), ph.RMSSD(), ph.Max()]
+        segmenter = ph.FixedSegments(step=.5, width=10, drop_cut=False)
+
+        rolling, columns = ph.fmap(segmenter(s), algos, rolling=True)
+        single = np.asarray(list(ph.ifmap(segmenter(s), algos)))
+
+        self.assertEqual(rolling.shape, single.shape)
+        np.testing.assert_allclose(rolling[:, 3:].astype(float), single[:, 3:].astype(float), rtol=1e-12)
+
+        # drift much larger than the fluctuations
+        v = np.linspace(0, 1e6, 20000) + np.random.randn(20000) * 1e-3
+        counts, means, variances = ph.window_moments(v, np.arange(0, 19000, 7), np.arange(1000, 20000, 7))
+        np.testing.assert_allclose(np.sqrt(variances), [np.std(v[b:b + 1000]) for b in range(0, 19000, 7)],
+                                   rtol=1e-9)
+
+        stats = ph.RollingStats()
+        v = s.get_values()
+        for x in v[:100]:
+            stats.add(x)
+        for x in v[:50]:
+            stats.remove(x)
+        self.assertEqual(stats.get_count(), 50)
+        self.assertAlmostEqual(stats.get_mean(), np.mean(v[50:100]))
+        self.assertAlmostEqual(stats.get_var(), np.var(v[50:100]), places=4)
+
     def test_ex_more(self):
         s = ph.EvenlySignal(np.cumsum(np.random.rand(1000) - .5) * 100, 10)
 
@@ -323,6 +498,157 @@ class GeneralTest(unittest.TestCase):
         for i in range(n):
             self.assertEqual(len(r[i]), len(r[i + n]))
 
+    def test_fixed_segments_bounds(self):
+        s = ph.EvenlySignal(values=np.random.rand(1000), sampling_freq=10, start_time=3)
+
+        def reference(step, width, start, drop_cut, drop_mixed):
+            # the per-window iteration
+            out = []
+            t = start if start is not None else s.get_start_time()
+            while t < s.get_end_time():
+                b, e = t, t + width
+                t += step
+                if e < s.get_start_time():
+                    continue
+                if b < s.get_start_time():
+                    if drop_cut or drop_mixed:
+                        continue
+                    b = s.get_start_time()
+                if e > s.get_end_time():
+                    if drop_cut:
+                        continue
+                    e = s.get_end_time()
+                out.append((b, e))
+            return out
+
+        for step, width, start in [(1, 3, None), (2, 2, None), (7, 11, 1), (0.5, 1.5, 2.2)]:
+            for drop_cut in [True, False]:
+                for drop_mixed in [True, False]:
+                    g = ph.FixedSegments(step=step, width=width, start=start, drop_cut=drop_cut,
+                                         drop_mixed=drop_mixed)(s)
+                    got = [(x.get_begin_time(), x.get_end_time()) for x in g]
+                    expected = reference(step, width, start, drop_cut, drop_mixed)
+                    self.assertEqual(len(got), len(expected))
+                    np.testing.assert_allclose(got, expected)
+                    b, e = g.compute_bounds()
+                    np.testing.assert_allclose(np.c_[b, e], expected)
+
+        # segments overlapping gaps
+        s.set_gaps([[105, 110]])
+        g = ph.FixedSegments(step=1, width=2, drop_gaps=True)(s)
+        b = [x.get_begin_time() for x in g]
+        self.assertEqual(len(b), len([x for x in ph.FixedSegments(step=1, width=2)(s)]) - 2)
+        self.assertNotIn(12, b)
+        self.assertNotIn(13, b)
+
+        # unevenly signal: segments before the first sample
+        u = ph.UnevenlySignal(values=np.arange(50.), x_values=np.arange(50) * 4 + 20, x_type='indices',
+                              sampling_freq=10, start_time=0)
+        u.set_gaps([[10, 12]])
+        b = [x.get_begin_time() for x in ph.FixedSegments(step=1, start=.5, drop_gaps=True)(u)]
+        self.assertIn(.5, b)
+        self.assertNotIn(5.5, b)
+        self.assertIn(6.5, b)
+
+    def test_label_segments_runs(self):
+        s = ph.EvenlySignal(values=np.random.rand(1000), sampling_freq=10)
+        labels = ph.EvenlySignal(values=np.repeat(['a', 'b', 'a', 'c', 'c', 'b'], [30, 1, 200, 69, 300, 400]),
+                                 sampling_freq=10)
+
+        starts, stops, values = ph.LabelRuns()(labels)
+        self.assertEqual(starts.tolist(), [0, 30, 31, 231, 600])
+        self.assertEqual(stops.tolist(), [30, 31, 231, 600, 1000])
+        self.assertEqual(values.tolist(), ['a', 'b', 'a', 'c', 'b'])
+
+        # computed once per label signal
+        self.assertIs(ph.LabelRuns()(labels)[0], starts)
+
+        segs = [x for x in ph.LabelSegments(labels=labels)(s)]
+        self.assertEqual([(x.get_begin_time(), x.get_end_time(), x.get_label()) for x in segs],
+                         [(0, 3, 'a'), (3, 3.1, 'b'), (3.1, 23.1, 'a'), (23.1, 60, 'c'), (60, 100, 'b')])
+
+    def test_mixed_labels(self):
+        s = ph.EvenlySignal(values=np.random.rand(1000), sampling_freq=10)
+        labels = ph.EvenlySignal(values=np.repeat([0, 1, 0, 2], [250, 5, 245, 500]), sampling_freq=10)
+
+        kept = [(x.get_begin_time(), x.get_label()) for x in ph.FixedSegments(step=5, width=10, labels=labels)(s)]
+        self.assertEqual(kept, [(0, 0), (5, 0), (10, 0), (15, 0), (30, 0), (35, 0), (40, 0),
+                                (50, 2), (55, 2), (60, 2), (65, 2), (70, 2), (75, 2), (80, 2), (85, 2), (90, 2)])
+
+        mixed = [(x.get_begin_time(), x.get_label()) for x in ph.FixedSegments(step=5, width=10, labels=labels,
+                                                                               drop_mixed=False)(s)]
+        self.assertEqual(len(mixed), 19)
+        self.assertEqual([b for b, l in mixed if l is None], [20, 25, 45])
+
+    def test_custom_segments_bulk(self):
+        s = ph.EvenlySignal(values=np.random.rand(1000), sampling_freq=10)
+        s.set_gaps([[600, 620]])
+        labels = ph.EvenlySignal(values=np.repeat([0, 1, 0, 2], [250, 5, 245, 500]), sampling_freq=10)
+        begins = np.arange(0, 100, 5.)
+        ends = begins + 10
+
+        # also a label signal that starts after the signal: the segments starting before it are mixed
+        late_labels = ph.EvenlySignal(values=np.repeat([1, 2], [300, 680]), sampling_freq=10, start_time=2)
+        for lab in [labels, late_labels]:
+            for kwargs in [{}, dict(drop_mixed=False), dict(drop_mixed=False, drop_cut=False), dict(drop_gaps=True)]:
+                fixed = [(x.get_begin_time(), x.get_end_time(), x.get_label())
+                         for x in ph.FixedSegments(step=5, width=10, labels=lab, **kwargs)(s)]
+                custom = [(x.get_begin_time(), x.get_end_time(), x.get_label())
+                          for x in ph.CustomSegments(begins=begins, ends=ends, labels=lab, **kwargs)(s)]
+                self.assertEqual(custom, fixed)
+
+        kwargs = dict(labels=late_labels, drop_mixed=False, drop_cut=False)
+        fixed = [(x.get_begin_time(), x.get_label()) for x in ph.FixedSegments(step=1, width=3, **kwargs)(s)]
+        custom = [(x.get_begin_time(), x.get_label())
+                  for x in ph.CustomSegments(begins=[0, 1, 2], ends=[3, 4, 5], **kwargs)(s)]
+        self.assertEqual(fixed[:3], [(0, None), (1, None), (2, 1)])
+        self.assertEqual(custom, fixed[:3])
+
+        begins = np.random.rand(500) * 100
+        ends = begins + np.random.rand(500) * 10
+        index = ph.IntervalIndex(begins, ends)
+        for t_start, t_stop in [(10, 12), (0, 100), (-5, 0), (99, 200), (50, 50.5)]:
+            expected = np.where((begins < t_stop) & (ends > t_start))[0]
+            self.assertEqual(sorted(index.overlapping(t_start, t_stop)), list(expected))
+            self.assertEqual(index.count_overlapping([t_start], [t_stop])[0], len(expected))
+        many = index.overlapping_many([10, 0], [12, 100])
+        self.assertEqual(sorted(many[1]), list(range(500)))
+        t_starts = np.random.rand(200) * 110 - 5
+        t_stops = t_starts + np.random.rand(200) * 3
+        for found, t_start, t_stop in zip(index.overlapping_many(t_starts, t_stops), t_starts, t_stops):
+            self.assertEqual(list(found), list(index.overlapping(t_start, t_stop)))
+        self.assertEqual(index.overlapping_many([], []), [])
+
+        g = ph.CustomSegments(begins=begins, ends=ends)(s)
+        self.assertEqual(sorted(g.get_overlapping(10, 12)), sorted(index.overlapping(10, 12)))
+
+    def test_fixed_segments_batch(self):
+        s = ph.EvenlySignal(values=np.cumsum(np.random.rand(5000) - .5), sampling_freq=10, start_time=2)
+
+        g = ph.FixedSegments(step=1, width=6)(s)
+        batch = g.get_batch()
+        segments = [x(s) for x in g]
+
+        self.assertEqual(batch.get_values().shape, (len(segments), 60))
+        self.assertTrue(np.shares_memory(batch.get_values(), s))
+
+        for alg in [ph.Mean(), ph.StDev(), ph.Min(), ph.Max(), ph.Range(), ph.RMSSD(), ph.AUC(), ph.Median()]:
+            np.testing.assert_allclose(alg(batch), [alg(x) for x in segments])
+
+        # not a whole number of samples: gathered
+        batch = ph.FixedSegments(step=0.25, width=1)(s).get_batch()
+        self.assertFalse(np.shares_memory(batch.get_values(), s))
+        np.testing.assert_allclose(ph.Mean()(batch), [np.mean(x) for x in batch])
+
+        # width not a whole number of samples: same samples as the segments, of different lengths
+        for step, width in [(0.5, 0.55), (0.3, 1)]:
+            g = ph.FixedSegments(step=step, width=width)(s)
+            batch = g.get_batch()
+            segments = [x(s) for x in g]
+            self.assertEqual(len(batch.get_values()), len(segments))
+            for alg in [ph.Mean(), ph.StDev(), ph.RMSSD(), ph.Median()]:
+                np.testing.assert_allclose(alg(batch), [alg(x) for x in segments])
+
     def test_cache_with_time_domain(self):
         samples = 1000
         freq_down = 13
@@ -209,3 +209,209 @@ class TestSignal(object):
         assert self.us.get_time(10) == self.us.get_start_time() + 10 / self.us.get_sampling_freq()
 
         #
+
+    def test_quantized_signal(self):
+        gain = 0.001
+        offset = -2.
+        counts = (np.round((TestData.ecg()[:20000] - offset) / gain)).astype(np.int16)
+        qs = ph.QuantizedSignal(values=counts, sampling_freq=self.freq1, gain=gain, offset=offset, start_time=self.start1)
+        es = qs.to_evenly()
+
+        # storage
+        assert qs.get_counts().dtype == np.int16
+        assert es.get_values() == approx(counts * gain + offset)
+        assert qs.dequantize(10, 20) == approx(es.get_values()[10:20])
+
+        # segmentation keeps the counts
+        seg = qs.segment_time(self.start1 + 10, self.start1 + 20)
+        assert isinstance(seg, ph.QuantizedSignal)
+        assert seg.get_counts().dtype == np.int16
+        assert seg.get_start_time() == es.segment_time(self.start1 + 10, self.start1 + 20).get_start_time()
+
+        # quantization-aware algorithms
+        assert ph.Min()(qs) == approx(np.min(es))
+        assert ph.Max()(qs) == approx(np.max(es))
+        assert ph.Range()(qs) == approx(np.max(es) - np.min(es))
+        d = ph.Diff()(qs)
+        assert isinstance(d, ph.QuantizedSignal)
+        assert d.get_values() == approx(ph.Diff()(es).get_values())
+        assert d.get_counts().dtype == np.int32
+
+        # long signals are filtered dequantizing a chunk at a time
+        default = ph.IIRFilter._chunk_size
+        to_evenly = ph.QuantizedSignal.to_evenly
+        try:
+            ph.IIRFilter._chunk_size = 2000
+            ph.QuantizedSignal.to_evenly = lambda s: to_evenly(s) if len(s) < len(qs) else pytest.fail("dequantized")
+            f = ph.IIRFilter(fp=5, fs=15)(qs)
+        finally:
+            ph.IIRFilter._chunk_size = default
+            ph.QuantizedSignal.to_evenly = to_evenly
+        assert f.get_start_time() == self.start1
+        assert f.get_values() == approx(ph.IIRFilter(fp=5, fs=15)(es).get_values(), abs=1e-9)
+        maxp, minp, maxv, minv = ph.PeakDetection(delta=0.5)(qs)
+        maxp_e, minp_e, maxv_e, minv_e = ph.PeakDetection(delta=0.5)(es)
+        assert np.all(maxp == maxp_e)
+        assert maxv == approx(maxv_e)
+
+        # the moments are computed dequantizing a block at a time, with gaps
+        to_evenly = ph.QuantizedSignal.to_evenly
+        default = ph.QuantizedSignal._block_size
+        qs_gaps = ph.QuantizedSignal(values=counts, sampling_freq=self.freq1, gain=gain, offset=offset)
+        qs_gaps.set_gaps([[100, 2500], [7000, 7001]])
+        es_gaps = qs_gaps.to_evenly()
+        try:
+            ph.QuantizedSignal._block_size = 1000
+            ph.QuantizedSignal.to_evenly = lambda s: pytest.fail("dequantized")
+            for q, e in [(qs, es), (qs_gaps, es_gaps)]:
+                for alg in [ph.Mean(), ph.StDev(), ph.Sum(), ph.AUC()]:
+                    assert alg(q) == approx(alg(e), rel=1e-12)
+        finally:
+            ph.QuantizedSignal._block_size = default
+            ph.QuantizedSignal.to_evenly = to_evenly
+
+        # the results are cached on the QuantizedSignal
+        ph.QuantizedSignal.to_evenly = lambda s: pytest.fail("dequantized")
+        try:
+            assert ph.Mean()(qs) == approx(ph.Mean()(es))
+        finally:
+            ph.QuantizedSignal.to_evenly = to_evenly
+
+        # other algorithms get the dequantized signal, once
+        assert ph.Median()(qs) == approx(ph.Median()(es))
+        ph.QuantizedSignal.to_evenly = lambda s: pytest.fail("dequantized")
+        try:
+            assert ph.Median()(qs) == approx(ph.Median()(es))
+        finally:
+            ph.QuantizedSignal.to_evenly = to_evenly
+
+        # not integers
+        with pytest.raises(AssertionError):
+            ph.QuantizedSignal(values=[1.5, 2.], sampling_freq=self.freq1)
+
+    def test_align(self):
+        ecg = ph.EvenlySignal(values=TestData.ecg()[:20000], sampling_freq=1000, start_time=1)
+        eda = ph.EvenlySignal(values=TestData.eda()[:100], sampling_freq=4, start_time=0)
+        ibi = ph.UnevenlySignal(values=[800, 810, 790, 805], x_values=[2, 3, 5, 12], x_type='instants',
+                                sampling_freq=1000, start_time=0)
+
+        a_ecg, a_eda, a_ibi = ph.align([ecg, eda, ibi], sampling_freq=1000)
+
+        # common grid
+        for x in [a_ecg, a_eda, a_ibi]:
+            assert x.get_start_time() == 1
+            assert x.get_sampling_freq() == 1000
+            assert len(x) == 11001
+
+        # same rate and on the grid: view on the original values
+        assert np.shares_memory(a_ecg, ecg)
+        assert a_ecg.get_values() == approx(ecg.get_values()[:11001])
+
+        # linear interpolation
+        assert a_eda.get_values() == approx(eda.resample(1000).get_values()[1000:12001])
+        assert a_ibi[2000] == approx(810)
+        assert a_ibi[3000] == approx(800)
+
+        a_eda_n, = ph.align([eda], sampling_freq=8, start_time=1, end_time=3, kind='nearest')
+        assert a_eda_n.get_values() == approx(np.repeat(eda.get_values()[4:12], 2))
+
+    def test_to_evenly_vectorized(self):
+        from scipy.interpolate import interp1d
+
+        # multi-hour EDA at 8 Hz
+        eda = ph.EvenlySignal(np.tile(TestData.eda()[::256], 100), sampling_freq=8, signal_nature='EDA')
+        assert eda.get_duration() > 3 * 3600
+
+        idx = np.unique(np.r_[0, np.random.randint(0, len(eda), len(eda) // 3), len(eda) - 1])
+        us = ph.UnevenlySignal(eda[idx], sampling_freq=8, x_values=idx, x_type='indices')
+
+        for kind in ['linear', 'nearest']:
+            expected = interp1d(idx, eda.get_values()[idx], kind=kind)(np.arange(len(eda)))
+            assert us.to_evenly(kind).get_values() == approx(expected)
+
+        # DenoiseEDA goes through the same path
+        denoised = ph.DenoiseEDA(threshold=0.01)(eda)
+        assert len(denoised) == len(eda)
+
+    def test_gaps(self):
+        s = ph.EvenlySignal(values=TestData.eda()[:10000], sampling_freq=self.freq1, start_time=self.start1)
+
+        # run-length encoded
+        mask = np.ones(len(s), dtype=bool)
+        mask[100:200] = False
+        mask[150:300] = False
+        mask[5000:5001] = False
+        s.set_mask(mask)
+        assert s.get_gaps().tolist() == [[100, 300], [5000, 5001]]
+        assert np.all(s.get_mask() == mask)
+        assert s.get_valid_runs().tolist() == [[0, 100], [300, 5000], [5001, 10000]]
+        assert s.is_valid(0, 100)
+        assert not s.is_valid(0, 101)
+        assert not s.is_valid(4000, 6000)
+        assert s.is_valid(300, 5000)
+
+        # segments keep their gaps
+        seg = s.segment_iidx(250, 1000)
+        assert seg.get_gaps().tolist() == [[0, 50]]
+        assert not s.segment_iidx(500, 1000).has_gaps()
+
+        # numpy slices and views shift (or drop) the gaps of the parent
+        assert s[250:1000].get_gaps().tolist() == [[0, 50]]
+        assert not s[500:1000].has_gaps()
+        assert s[4000:].get_gaps().tolist() == [[1000, 1001]]
+        assert ph.Mean()(s[500:]) == approx(np.mean(np.delete(s.get_values()[500:], 4500)))
+        assert not s[::-1].has_gaps()
+        assert not s[::2].has_gaps()
+        assert (s * 2).get_gaps().tolist() == s.get_gaps().tolist()
+        assert np.diff(s).get_gaps().tolist() == [[99, 300], [4999, 5001]]
+
+        # indicators skip the gaps
+        s_nan = ph.EvenlySignal(np.where(mask, s.get_values(), np.nan), sampling_freq=self.freq1)
+        assert ph.Mean()(s) == approx(ph.Mean()(s_nan))
+        assert ph.StDev()(s) == approx(ph.StDev()(s_nan))
+        assert ph.Min()(s) == approx(ph.Min()(s_nan))
+        assert ph.Median()(s) == approx(np.median(s.get_values()[mask]))
+        d = ph.Diff()(s)
+        assert d.get_gaps().tolist() == [[99, 300], [4999, 5001]]
+        valid = s.get_valid_runs()
+        rmssd = np.sqrt(np.mean(np.concatenate([np.diff(s.get_values()[b:e]) for b, e in valid]) ** 2))
+        assert ph.RMSSD()(s) == approx(rmssd)
+
+        # filters are split around the gaps
+        f = ph.ConvolutionalFilter(irftype='rect', win_len=0.5)
+        s_f = f(s)
+        assert s_f.get_gaps().tolist() == s.get_gaps().tolist()
+        assert s_f.get_values()[300:5000] == approx(f(s.segment_iidx(300, 5000)).get_values())
+        assert s_f.get_values()[100:300] == approx(s.get_values()[100:300])
+
+    def test_segment_many(self):
+        s = ph.EvenlySignal(values=TestData.ecg()[:20000], sampling_freq=self.freq1, start_time=self.start1)
+        begins = np.arange(s.get_start_time(), s.get_end_time() - 3, 0.5)
+        ends = begins + 3
+
+        views = s.segment_many(begins, ends)
+        assert len(views) == len(begins)
+        for i in [0, 1, 17, len(views) - 1]:
+            expected = s.segment_time(begins[i], ends[i])
+            assert views[i].get_start_time() == expected.get_start_time()
+            assert views[i].get_values() == approx(expected.get_values())
+            assert np.shares_memory(views[i], s)
+
+        block = views.to_array()
+        assert block.shape == (len(begins), 300)
+        assert block[17] == approx(views[17].get_values())
+
+        # padded
+        views = s.segment_many([s.get_start_time(), s.get_end_time() - 1], [s.get_start_time() + 2,
+                                                                             s.get_end_time() + 1])
+        block = views.to_array()
+        assert block.shape == (2, 200)
+        assert np.all(np.isnan(block[1, 100:]))
+        assert views.get_lengths().tolist() == [200, 100]
+
+        # unevenly
+        us = self.us
+        views = us.segment_many([us.get_start_time() + 1, us.get_start_time() + 5],
+                                [us.get_start_time() + 3, us.get_start_time() + 9])
+        assert len(views[1]) == len(us.segment_time(us.get_start_time() + 5, us.get_start_time() + 9))
+        assert views.to_array()[0, :views.get_lengths()[0]] == approx(views[0].get_values())
@@ -75,3 +75,22 @@ def test_tools():
     # TEST Minima
     idx_mn, mn = ph.Minima(method='windowing', win_len=1, win_step=0.5)(bvp)
     assert (np.sum(idx_mn) == 17939276)
+
+
+def test_filter_bank():
+    ecg = ph.EvenlySignal(TestData.ecg(), sampling_freq=2048, start_time=5)
+    bands = [(1, 2), (10, 20), ([5, 25], [1, 50]), (70, 45)]
+
+    exact = ph.FilterBank(bands, decimate=False)(ecg)
+    bank = ph.FilterBank(bands)(ecg)
+    assert len(bank) == len(bands)
+
+    for (fp, fs), x, y in zip(bands, exact, bank):
+        reference = ph.IIRFilter(fp=fp, fs=fs)(ecg)
+        np.testing.assert_array_equal(x, reference)
+        assert len(y) == len(ecg) and y.get_start_time() == 5
+        # decimated: close to the filter at the full rate, far from the edges
+        assert np.max(np.abs(y - reference)[5000:-5000]) < 0.05 * np.ptp(reference)
+
+    assert ph.IIRFilter.get_decimation_factor(2048, 10, 20) == 16
+    assert ph.IIRFilter.get_decimation_factor(2048, 70, 45) == 1
@@ -1,13 +1,14 @@
 # coding=utf-8
 from __future__ import division
 import numpy as _np
-from scipy.signal import welch as _welch
+from scipy.signal import welch as _welch, sosfiltfilt as _sosfiltfilt
 import scipy.optimize as _opt
 from spectrum import aryule as _aryule, arma2psd as _arma2psd, AIC as _AIC
 import itertools as _itertools
 from ..BaseTool import Tool as _Tool
-from ..Signal import UnevenlySignal as _UnevenlySignal, EvenlySignal as _EvenlySignal
-from ..filters.Filters import Diff as _Diff, ConvolutionalFilter as _ConvFlt
+from ..Signal import UnevenlySignal as _UnevenlySignal, EvenlySignal as _EvenlySignal, \
+    QuantizedSignal as _QuantizedSignal
+from ..filters.Filters import Diff as _Diff, ConvolutionalFilter as _ConvFlt, IIRFilter as _IIRFlt
 
 
 class PeakDetection(_Tool):
@@ -38,6 +39,8 @@ class PeakDetection(_Tool):
         Array containing values of the minima
     """
 
+    _quantized = True
+
     def __init__(self, delta, refractory=0, start_max=True):
         delta = _np.array(delta)
         assert delta.ndim <= 1, "Delta value should be 1 or 0-dimensional"
@@ -55,6 +58,13 @@ class PeakDetection(_Tool):
         look_for_max = params['start_max']
         delta = params['delta']
 
+        quantized = isinstance(signal, _QuantizedSignal)
+        if quantized:
+            # detect on the counts, with the threshold expressed in counts (positive gain keeps the ordering)
+            q_signal = signal
+            delta = delta / signal.get_gain()
+            signal = signal.get_counts()
+
         minp = []
         maxp = []
 
@@ -109,6 +119,10 @@ class PeakDetection(_Tool):
 
                         look_for_max = True
 
+        if quantized:
+            maxv = q_signal.to_physical(maxv)
+            minv = q_signal.to_physical(minv)
+
         return _np.array(maxp), _np.array(minp), _np.array(maxv), _np.array(minv)
 
 
@@ -1506,3 +1520,123 @@ class Histogram(_Tool):
     @classmethod
     def algorithm(cls, signal, params):
         return _np.histogram(signal, params['histogram_bins'])
+
+
+class LabelRuns(_Tool):
+    """
+    Find the runs of equal subsequent values in a (label) signal, with a single vectorized pass.
+    The result is cached on the signal, so segment generators that share the same labels compute it once.
+
+    Returns
+    -------
+    starts : numpy.array
+        Inner index of the first sample of each run
+    stops : numpy.array
+        Inner index after the last sample of each run
+    labels : numpy.array
+        Value of each run
+    """
+
+    def __init__(self):
+        _Tool.__init__(self)
+
+    @classmethod
+    def algorithm(cls, signal, params):
+        values = _np.asarray(signal)
+        if len(values) == 0:
+            return _np.zeros(0, dtype=int), _np.zeros(0, dtype=int), values[:0]
+
+        changes = _np.where(values[1:] != values[:-1])[0] + 1
+        starts = _np.r_[0, changes]
+        stops = _np.r_[changes, len(values)]
+        return starts, stops, values[starts]
+
+
+class LabelChanges(_Tool):
+    """
+    Prefix count of the label changes in a (label) signal: the portion [i, j] of the signal holds a single label if
+    and only if changes[j] == changes[i]. The result is cached on the signal.
+
+    Returns
+    -------
+    changes : numpy.array
+        Number of changes between subsequent samples up to each sample
+    """
+
+    def __init__(self):
+        _Tool.__init__(self)
+
+    @classmethod
+    def algorithm(cls, signal, params):
+        starts, stops, labels = LabelRuns()(signal)
+        changes = _np.zeros(len(signal), dtype=int)
+        changes[starts[1:]] = 1
+        return _np.cumsum(changes)
+
+
+class FilterBank(_Tool):
+    """
+    Filters the signal in several bands at once, with the IIR filters of IIRFilter.
+    The bands whose upper edge is far below the Nyquist frequency are filtered on a decimated signal (see
+    IIRFilter.get_decimation_factor). The decimated signals are computed once, each from the previous one, and
+    shared by all the bands, then each output is interpolated back to the sampling frequency of the signal.
+
+    Parameters
+    ----------
+    bands : list
+        The bands, as (fp, fs) pairs of pass and stop frequencies (see IIRFilter)
+
+    Optional parameters
+    -------------------
+    loss : float, >0, default = 0.1
+        Loss tolerance in the pass band
+    att : float, >0, default = 40
+        Minimum attenuation required in the stop band.
+    ftype : str, default = 'butter'
+        Type of filter. Available types: 'butter', 'cheby1', 'cheby2', 'ellip', 'bessel'
+    decimate : bool, default = True
+        Whether to filter the low bands on decimated signals. If False the result of each band is the one of
+        IIRFilter.
+
+    Returns
+    -------
+    signals : list of EvenlySignal
+        The filtered signal of each band. They are the rows of a single (bands x samples) array.
+    """
+
+    def __init__(self, bands, loss=.1, att=40, ftype='butter', decimate=True):
+        assert len(bands) > 0, "At least a band is needed"
+        assert all(len(b) == 2 for b in bands), "The bands should be (fp, fs) pairs"
+        assert loss > 0, "Loss value should be positive"
+        assert att > loss, "Attenuation value should be greater than loss value"
+        _Tool.__init__(self, bands=bands, loss=loss, att=att, ftype=ftype, decimate=decimate)
+
+    @classmethod
+    def algorithm(cls, signal, params):
+        bands = params['bands']
+        fsamp = signal.get_sampling_freq()
+        values = _np.asarray(signal.get_values(), dtype=float)
+        n = len(values)
+
+        factors = [_IIRFlt.get_decimation_factor(fsamp, fp, fs) if params['decimate'] else 1 for fp, fs in bands]
+        out = _np.empty((len(bands), n))
+
+        stage, q = values, 1
+        for factor in sorted(set(factors)):
+            if q < factor:
+                stage = _IIRFlt.decimate(stage, factor // q)
+                q = factor
+            for i in [i for i, f in enumerate(factors) if f == factor]:
+                fp, fs = bands[i]
+                sos = _IIRFlt.design(fsamp / q, fp, fs, params['loss'], params['att'], params['ftype'])
+                if len(stage) <= 3 * (2 * len(sos) + 1):
+                    cls.warn('Signal too short for the filter of the band ' + str(bands[i]) +
+                             '. Returning original signal.')
+                    out[i] = values
+                elif q == 1:
+                    out[i] = _sosfiltfilt(sos, stage)
+                else:
+                    out[i] = _IIRFlt.interpolate(_sosfiltfilt(sos, stage), q, n)
+
+        return [_EvenlySignal(x, sampling_freq=fsamp, signal_nature=signal.get_signal_nature(),
+                              start_time=signal.get_start_time()) for x in out]